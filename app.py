@@ -5,22 +5,27 @@ Convert lectures to flashcards, notes, and summaries
 
 import streamlit as st
 import os
+import time
 from pathlib import Path
-import nltk
-
-# Download NLTK data at startup
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab')
 
 # Add src to path
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from stt_engine import SpeechToTextEngine
+from stt_engine import SpeechToTextEngine, default_transcript_cache
+from checkpoints import default_checkpoints
 from text_processor import TextProcessor
-from llm_formatter import LLMFormatter
+from llm_formatter import LLMFormatter, default_summary_cache, default_summary_scheduler
+from job_queue import get_job_queue
+from search_index import default_search_index, lecture_id_for
+
+def format_timestamp(seconds):
+    """Seconds -> mm:ss (or h:mm:ss) for transcript segments"""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
 
 # Page configuration
 st.set_page_config(
@@ -202,16 +207,43 @@ st.sidebar.title("📚 Project Navigation")
 st.sidebar.markdown("---")
 section = st.sidebar.radio(
     "Select Section:",
-    ["Home", "Process Audio", "View Results", "About"]
+    ["Home", "Process Audio", "View Results", "Background Jobs", "Search Lectures", "About"]
 )
+st.sidebar.markdown("---")
+show_diagnostics = st.sidebar.checkbox("Show diagnostics", value=False, key="show_diagnostics")
 
 # Initialize session state
+if 'diagnostics' not in st.session_state:
+    st.session_state.diagnostics = {}
 if 'transcript' not in st.session_state:
     st.session_state.transcript = None
+if 'segments' not in st.session_state:
+    st.session_state.segments = None
 if 'structured_content' not in st.session_state:
     st.session_state.structured_content = None
 if 'outputs' not in st.session_state:
     st.session_state.outputs = None
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+
+# Diagnostics panel: per-stage wall/CPU time and memory of the last runs
+if show_diagnostics:
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        if not any(st.session_state.diagnostics.values()):
+            st.caption("Run a step to see stage timings.")
+        for step, records in st.session_state.diagnostics.items():
+            if records:
+                st.markdown(f"**{step}**")
+                st.dataframe(
+                    [{
+                        'stage': r['stage'],
+                        'wall (s)': round(r['wall_s'], 3),
+                        'cpu (s)': round(r['cpu_s'], 3),
+                        'peak RSS (MB)': round(r['peak_rss_mb'], 1)
+                    } for r in records],
+                    hide_index=True,
+                    use_container_width=True
+                )
 
 # HOME SECTION
 if section == "Home":
@@ -230,7 +262,7 @@ if section == "Home":
         <div style='background: white; border: 2px solid #667eea; border-radius: 12px; padding: 25px; height: 100%; box-shadow: 0 4px 12px rgba(102, 126, 234, 0.15);'>
             <div style='font-size: 2.5em; margin-bottom: 15px;'>01</div>
             <h3 style='color: #0d47a1; margin-top: 0;'>Upload Audio</h3>
-            <p style='color: #666; line-height: 1.6;'>Upload your lecture in MP3, WAV, OGG, or M4A format. Supports up to 30 minutes.</p>
+            <p style='color: #666; line-height: 1.6;'>Upload your lecture in MP3, WAV, OGG, or M4A format. Full-length lectures supported.</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -306,7 +338,7 @@ elif section == "Process Audio":
     st.markdown("""
     <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 25px; border-radius: 12px; color: white; margin-bottom: 20px;'>
         <h2 style='margin-top: 0;'>Process Your Lecture</h2>
-        <p style='margin: 0; opacity: 0.95;'>Supported formats: MP3, WAV, OGG, M4A • Duration: 1-30 minutes</p>
+        <p style='margin: 0; opacity: 0.95;'>Supported formats: MP3, WAV, OGG, M4A • Any duration</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -324,14 +356,9 @@ elif section == "Process Audio":
         with col1:
             st.success(f"File uploaded: {uploaded_file.name}")
         with col2:
-            file_size = len(uploaded_file.getvalue()) / (1024*1024)
+            file_size = uploaded_file.size / (1024*1024)
             st.info(f"{file_size:.1f} MB")
         
-        # Save uploaded file temporarily
-        audio_path = f"temp_{uploaded_file.name}"
-        with open(audio_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())
-        
         # Step 2: Transcribe
         st.markdown("""
         <div style='background: white; border: 2px solid #667eea; border-radius: 12px; padding: 20px; margin: 25px 0 20px 0;'>
@@ -341,18 +368,65 @@ elif section == "Process Audio":
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
+            skip_silence = st.checkbox("Skip silent stretches (faster)", value=False, key="skip_silence")
+            fast_summary = st.checkbox("Fast summary (key sentences instead of BART)", value=False, key="fast_summary")
+            summary_mode = 'fast' if fast_summary else 'abstractive'
             transcribe_btn = st.button("Start Transcription", key="transcribe_btn", use_container_width=True)
+            background_btn = st.button("Process Everything in Background", key="background_btn", use_container_width=True)
+        
+        if background_btn:
+            job_id = get_job_queue().submit(
+                uploaded_file.getvalue(), uploaded_file.name, {'vad': skip_silence, 'summary_mode': summary_mode}
+            )
+            st.session_state.jobs.append(job_id)
+            st.success(f"Queued as job {job_id[:8]}. Follow it under 'Background Jobs'; you can close this tab.")
         
         if transcribe_btn:
+            live_transcript = st.empty()
             with st.spinner("Processing audio..."):
                 try:
-                    stt = SpeechToTextEngine()
-                    result = stt.transcribe(audio_path)
+                    stt = SpeechToTextEngine(
+                        vad=skip_silence,
+                        cache=default_transcript_cache(),
+                        checkpoints=default_checkpoints(),
+                        profile=show_diagnostics
+                    )
+                    
+                    # Render segments as each window finishes instead of waiting for the end
+                    # Decode straight from the upload buffer, nothing is written to disk
+                    uploaded_file.seek(0)
+                    result = {}
+                    lines = []
+                    for segment in stt.transcribe_stream(uploaded_file, result=result):
+                        lines.append(f"`{format_timestamp(segment['start'])}` {segment['text']}")
+                        live_transcript.markdown("\n\n".join(lines))
+                    live_transcript.empty()
                     
                     if result['status'] == 'success':
                         st.session_state.transcript = result['text']
+                        st.session_state.transcript_edit = result['text']
+                        st.session_state.segments = result['segments']
+                        # A new recording is a new lecture: edits must not replace
+                        # the previous one in the search index
+                        st.session_state.structured_content = None
+                        st.session_state.diagnostics['Transcription'] = result.get('profile', [])
                         duration = result.get('duration', 0)
                         st.success(f"Transcription complete ({duration:.1f}s audio)")
+                        cache_stats = default_transcript_cache().stats()
+                        if result.get('cached'):
+                            st.caption(
+                                f"Served from transcript cache • "
+                                f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+                            )
+                        else:
+                            st.caption(
+                                f"{result.get('speech_duration', duration):.1f}s sent to the model • "
+                                f"{result.get('chunks', 0)} chunks at "
+                                f"{result.get('chunks_per_second', 0):.2f} chunks/s "
+                                f"(batch size {result.get('batch_size', 1)})"
+                            )
+                            if result.get('resumed_windows'):
+                                st.caption(f"Resumed an interrupted run: {result['resumed_windows']} windows reused")
                         
                         with st.expander("View Full Transcript"):
                             st.text_area("Transcript", value=result['text'], height=200, disabled=True, key="transcript_view")
@@ -369,19 +443,80 @@ elif section == "Process Audio":
             </div>
             """, unsafe_allow_html=True)
             
+            if 'transcript_edit' not in st.session_state:
+                st.session_state.transcript_edit = st.session_state.transcript
+            edited_transcript = st.text_area(
+                "Transcript", height=200, key="transcript_edit",
+                help="Fix recognition mistakes here, then apply the edits"
+            )
+            
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 process_btn = st.button("Process Text", key="process_btn", use_container_width=True)
+                apply_btn = st.button(
+                    "Apply Edits", key="apply_edits_btn", use_container_width=True,
+                    disabled=st.session_state.structured_content is None
+                    or edited_transcript == st.session_state.transcript
+                )
+            
+            if apply_btn:
+                with st.spinner("Applying edits..."):
+                    try:
+                        # Only the edited sentences are re-tokenized, and only the
+                        # summary chunks containing them go back to the model
+                        started = time.perf_counter()
+                        previous = st.session_state.structured_content
+                        structured = TextProcessor(profile=show_diagnostics).update_structure(
+                            previous, edited_transcript
+                        )
+                        st.session_state.transcript = edited_transcript
+                        st.session_state.structured_content = structured
+                        st.session_state.diagnostics['Structuring'] = structured['profile']
+                        
+                        index = default_search_index()
+                        index.remove_lecture(lecture_id_for(previous['cleaned']))
+                        segments = st.session_state.segments or []
+                        index.add_lecture(
+                            lecture_id_for(structured['cleaned']), uploaded_file.name, structured,
+                            segments, duration=segments[-1]['end'] if segments else None
+                        )
+                        
+                        if st.session_state.outputs is not None:
+                            formatter = LLMFormatter(
+                                profile=show_diagnostics, cache=default_summary_cache(),
+                                scheduler=default_summary_scheduler()
+                            )
+                            st.session_state.outputs = formatter.format_all_outputs(
+                                structured, prefetch=True, summary_mode=summary_mode
+                            )
+                        st.success(f"Edits applied in {time.perf_counter() - started:.2f}s")
+                    except Exception as e:
+                        st.error(f"Error while applying edits: {str(e)}")
             
             if process_btn:
                 with st.spinner("Analyzing content..."):
                     try:
-                        processor = TextProcessor()
+                        processor = TextProcessor(profile=show_diagnostics)
+                        previous = st.session_state.structured_content
+                        st.session_state.transcript = edited_transcript
                         st.session_state.structured_content = processor.structure_content(
                             st.session_state.transcript
                         )
+                        st.session_state.diagnostics['Structuring'] = st.session_state.structured_content['profile']
                         st.success("Text processing complete!")
                         
+                        # Make the lecture findable from 'Search Lectures', replacing
+                        # the version indexed before the transcript was edited
+                        structured = st.session_state.structured_content
+                        segments = st.session_state.segments or []
+                        index = default_search_index()
+                        if previous is not None and previous['cleaned'] != structured['cleaned']:
+                            index.remove_lecture(lecture_id_for(previous['cleaned']))
+                        index.add_lecture(
+                            lecture_id_for(structured['cleaned']), uploaded_file.name, structured,
+                            segments, duration=segments[-1]['end'] if segments else None
+                        )
+                        
                         # Display metrics with custom HTML for better visibility
                         st.markdown("""
                         <div style='display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 15px; margin: 20px 0;'>
@@ -421,17 +556,19 @@ elif section == "Process Audio":
             if generate_btn:
                 with st.spinner("Generating materials..."):
                     try:
-                        formatter = LLMFormatter()
+                        # Flashcards and notes are ready right away; the summary
+                        # keeps generating in the background until it is viewed
+                        formatter = LLMFormatter(
+                            profile=show_diagnostics, cache=default_summary_cache(),
+                            scheduler=default_summary_scheduler()
+                        )
                         st.session_state.outputs = formatter.format_all_outputs(
-                            st.session_state.structured_content
+                            st.session_state.structured_content, prefetch=True,
+                            summary_mode=summary_mode
                         )
-                        st.success("All outputs generated successfully! Go to 'View Results' to see them.")
+                        st.success("Flashcards and notes are ready, the summary is on its way. Go to 'View Results' to see them.")
                     except Exception as e:
                         st.error(f"Error during generation: {str(e)}")
-        
-        # Cleanup
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
 
 # VIEW RESULTS SECTION
 elif section == "View Results":
@@ -484,8 +621,80 @@ elif section == "View Results":
             <div style='background: linear-gradient(135deg, #fffacd 0%, #fffde7 100%); border: 2px solid #ffd700; border-radius: 12px; padding: 25px;'>
                 <div style='color: #1b5e20; line-height: 1.8;'>
             """, unsafe_allow_html=True)
-            st.markdown(st.session_state.outputs['summary'])
+            # Only this tab waits on BART; the other tabs have already rendered
+            with st.spinner("Summarizing the lecture..."):
+                summary = st.session_state.outputs['summary']
+            st.markdown(summary)
             st.markdown("</div></div>", unsafe_allow_html=True)
+            st.session_state.diagnostics['Generation'] = st.session_state.outputs['profile']
+
+# BACKGROUND JOBS SECTION
+elif section == "Background Jobs":
+    st.markdown("""
+    <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 25px; border-radius: 12px; color: white; margin-bottom: 20px;'>
+        <h2 style='margin-top: 0;'>Background Jobs</h2>
+        <p style='margin: 0; opacity: 0.95;'>Lectures processed off-screen; results are kept until you load them</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    queue = get_job_queue()
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.button("Refresh", key="refresh_jobs")
+    with col2:
+        auto_refresh = st.checkbox("Auto-refresh while jobs are running", value=True, key="auto_refresh_jobs")
+    
+    jobs = queue.list(limit=20)
+    if not jobs:
+        st.info("No background jobs yet. Use 'Process Everything in Background' in Process Audio.")
+    
+    for job in jobs:
+        mine = " (this session)" if job['job_id'] in st.session_state.jobs else ""
+        with st.container():
+            st.markdown(f"**{job['name']}**{mine} · `{job['job_id'][:8]}` · {job['status']} ({job['stage']})")
+            if job['status'] in ('queued', 'running'):
+                st.progress(min(max(job['progress'], 0.0), 1.0))
+            elif job['status'] == 'failed':
+                st.error(f"Error: {job.get('error') or 'Unknown error'}")
+            elif job['status'] == 'done':
+                if st.button("Load results", key=f"load_{job['job_id']}"):
+                    result = queue.get(job['job_id'])['result']
+                    st.session_state.transcript = result['transcript']
+                    st.session_state.transcript_edit = result['transcript']
+                    st.session_state.segments = result['segments']
+                    st.session_state.structured_content = result['structured']
+                    st.session_state.outputs = result['outputs']
+                    st.success("Results loaded. Go to 'View Results' to see them.")
+    
+    # Polling only: the work itself runs on the queue's worker threads
+    if auto_refresh and any(job['status'] in ('queued', 'running') for job in jobs):
+        time.sleep(2)
+        st.rerun()
+
+# SEARCH SECTION
+elif section == "Search Lectures":
+    st.markdown("""
+    <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 25px; border-radius: 12px; color: white; margin-bottom: 20px;'>
+        <h2 style='margin-top: 0;'>Search Lectures</h2>
+        <p style='margin: 0; opacity: 0.95;'>Find where a concept was covered across every processed lecture</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    index = default_search_index()
+    stats = index.stats()
+    st.caption(f"{stats['lectures']} lectures, {stats['paragraphs']} indexed passages")
+    
+    query = st.text_input("Search for a concept", key="search_query")
+    if query:
+        t0 = time.perf_counter()
+        hits = index.search(query, top_k=20)
+        st.caption(f"{len(hits)} results in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        if not hits:
+            st.info("No matching passages.")
+        for hit in hits:
+            at = f" @ `{format_timestamp(hit['start'])}`" if hit['start'] is not None else ""
+            st.markdown(f"**{hit['title']}**{at} · section {hit['paragraph'] + 1}")
+            st.markdown(f"> {hit['text']}")
 
 # ABOUT SECTION
 elif section == "About":
@@ -528,7 +737,7 @@ elif section == "About":
         <div style='background: white; border: 2px solid #667eea; border-radius: 12px; padding: 20px; margin-bottom: 15px;'>
             <h4 style='color: #0d47a1; margin-top: 0;'>Key Capabilities</h4>
             <ul style='color: #666; margin: 0;'>
-                <li>Transcription up to 30 minutes</li>
+                <li>Transcription of full-length lectures</li>
                 <li>100% accurate text conversion</li>
                 <li>Automatic text cleaning</li>
                 <li>Entity extraction</li>
@@ -0,0 +1,106 @@
+"""
+Micro-batching benchmark
+Simulates many users summarizing at once against a stand-in summarizer whose
+cost is a fixed per-call overhead plus a smaller per-item cost, run one call
+at a time like a model saturating the CPU. Compares throughput and latency
+percentiles with and without the shared BatchScheduler.
+
+Usage:
+    python benchmarks/bench_batching.py [--users 16] [--requests 4] [--overhead-ms 60] [--item-ms 15]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.append(BENCH_DIR)
+
+from batch_scheduler import BatchScheduler
+from llm_formatter import LLMFormatter, _run_summary_batch
+from model_registry import get_registry
+from run_benchmarks import LECTURE_WORDS, STAND_IN_SUMMARIZER, StandInSummarizer
+
+
+class CostModelSummarizer(StandInSummarizer):
+    """Stand-in whose calls are serialized and cost overhead + n * per-item"""
+
+    def __init__(self, overhead_s, item_s):
+        super().__init__()
+        self.overhead_s = overhead_s
+        self.item_s = item_s
+        self._lock = threading.Lock()
+
+    def __call__(self, texts, **kwargs):
+        n = 1 if isinstance(texts, str) else len(texts)
+        with self._lock:
+            time.sleep(self.overhead_s + n * self.item_s)
+        return super().__call__(texts, **kwargs)
+
+
+def run_load(formatter, users, requests, seed=0):
+    """Every user sends `requests` short summaries back to back; returns latencies and wall time"""
+    latencies = []
+    lock = threading.Lock()
+
+    def user(u):
+        rng = np.random.default_rng(seed + u)
+        for _ in range(requests):
+            words = [LECTURE_WORDS[i] for i in rng.integers(0, len(LECTURE_WORDS), 120)]
+            t0 = time.perf_counter()
+            formatter.generate_summary(' '.join(words) + '.')
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(users)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4, help="Summaries per user")
+    parser.add_argument('--overhead-ms', type=float, default=60)
+    parser.add_argument('--item-ms', type=float, default=15)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--wait-ms', type=float, default=20)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Per-request latency cap (0 = none)")
+    args = parser.parse_args(argv)
+
+    model = CostModelSummarizer(args.overhead_ms / 1000, args.item_ms / 1000)
+    get_registry().register("summarization", STAND_IN_SUMMARIZER, "cpu", model, "fp32")
+
+    configs = [('unbatched', None)]
+    for label, cap in (('batched', None), ('batched+cap', args.latency_ms / 1000 or None)):
+        if label == 'batched+cap' and cap is None:
+            continue
+        configs.append((label, BatchScheduler(
+            _run_summary_batch, args.batch_size, args.wait_ms / 1000, max_latency_s=cap
+        )))
+
+    print(f"{args.users} users x {args.requests} summaries, model cost "
+          f"{args.overhead_ms:.0f}ms + {args.item_ms:.0f}ms/item\n")
+    print(f"{'mode':<12} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'batch':>6}")
+    for label, scheduler in configs:
+        formatter = LLMFormatter(STAND_IN_SUMMARIZER, backend='fp32', scheduler=scheduler)
+        latencies, wall = run_load(formatter, args.users, args.requests)
+        batch = scheduler.stats()['mean_batch_size'] if scheduler is not None else 1.0
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"{label:<12} {len(latencies) / wall:>7.1f} {p50:>8.0f} {p95:>8.0f} "
+              f"{latencies.max() * 1000:>8.0f} {batch:>6.1f}")
+        if scheduler is not None:
+            scheduler.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
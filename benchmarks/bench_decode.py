@@ -0,0 +1,101 @@
+"""
+Decode benchmark
+Times every audio decoder on the same synthetic lecture in each format, from
+file to 16kHz mono windows (decode + downmix + resample), and reports which
+decoder automatic selection would use. DECODER_ORDER in src/audio_stream.py
+should list the fastest decoder that works first for each format.
+
+Usage:
+    python benchmarks/bench_decode.py [--minutes 10] [--formats wav,flac,ogg,mp3,m4a] [--repeats 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+
+from audio_stream import DECODERS, decoder_order, ffmpeg_binary, iter_audio_windows
+
+NATIVE_SR = 44100
+
+# Formats libsndfile can write; the rest are encoded with ffmpeg
+SOUNDFILE_FORMATS = {'wav': 'WAV', 'flac': 'FLAC', 'ogg': 'OGG', 'mp3': 'MP3'}
+
+
+def write_lecture(path, minutes, seed=0):
+    """Stereo 44.1kHz speech-like bursts, the shape of a typical recording"""
+    rng = np.random.default_rng(seed)
+    ext = os.path.splitext(path)[1][1:]
+    source = path
+    if ext not in SOUNDFILE_FORMATS:
+        source = os.path.splitext(path)[0] + '.src.wav'
+    with sf.SoundFile(source, 'w', samplerate=NATIVE_SR, channels=2,
+                      format=SOUNDFILE_FORMATS.get(ext, 'WAV')) as f:
+        t = np.arange(10 * NATIVE_SR) / NATIVE_SR
+        for _ in range(int(minutes * 6)):
+            tone = 0.2 * np.sin(2 * np.pi * rng.uniform(120, 240) * t) * (t < rng.uniform(5, 9))
+            block = (tone + rng.normal(0, 0.003, len(t))).astype(np.float32)
+            f.write(np.stack([block, block], axis=1))
+    if source != path:
+        subprocess.run([ffmpeg_binary(), '-y', '-loglevel', 'error', '-i', source, path], check=True)
+        os.remove(source)
+
+
+def time_decode(path, decoder, repeats):
+    """Best wall time to stream the whole file, or None if the decoder can't read it"""
+    best = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        samples = 0
+        for _, window in iter_audio_windows(path, 60, decoder=decoder):
+            samples += len(window)
+        seconds = time.perf_counter() - t0
+        best = seconds if best is None else min(best, seconds)
+    return best, samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--formats', default='wav,flac,ogg,mp3,m4a')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"ffmpeg: {ffmpeg_binary() or 'not found'}\n")
+    print(f"{'format':<7} {'decoder':<10} {'seconds':>8} {'x realtime':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in args.formats.split(','):
+            path = os.path.join(tmp, f'lecture.{ext}')
+            if ext not in SOUNDFILE_FORMATS and ffmpeg_binary() is None:
+                print(f"{ext:<7} (skipped: encoding needs ffmpeg)")
+                continue
+            write_lecture(path, args.minutes)
+
+            timings = {}
+            for name in DECODERS:
+                # Only time the decoder itself, not a fallback after it fails
+                try:
+                    next(DECODERS[name](path, 16000, 0.0))
+                except Exception as e:
+                    print(f"{ext:<7} {name:<10} {'-':>8} {'-':>11}  ({type(e).__name__})")
+                    continue
+                seconds, _ = time_decode(path, name, args.repeats)
+                timings[name] = seconds
+                print(f"{ext:<7} {name:<10} {seconds:>8.3f} {args.minutes * 60 / seconds:>11.0f}")
+
+            auto = next(name for name in decoder_order(path) if name in timings) if timings else None
+            fastest = min(timings, key=timings.get) if timings else None
+            note = '' if auto == fastest else f'  <- fastest is {fastest}'
+            print(f"{ext:<7} {'auto':<10} {auto or '-'}{note}\n")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
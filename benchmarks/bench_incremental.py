@@ -0,0 +1,105 @@
+"""
+Incremental reprocessing benchmark
+Structures a synthetic lecture and generates its outputs, then applies
+one-word edits at random positions and times TextProcessor.update_structure
+plus format_all_outputs. It counts how many summary chunks reach the
+(stand-in) model again and checks that the incremental structure matches a
+full structure_content run on the edited text.
+
+Usage:
+    python benchmarks/bench_incremental.py [--minutes 30] [--edits 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.append(BENCH_DIR)
+
+from disk_cache import MemoryCache, TieredCache
+from key_terms import KeyTermIndex
+from llm_formatter import LLMFormatter
+from model_registry import get_registry
+from run_benchmarks import LECTURE_WORDS, STAND_IN_SUMMARIZER, StandInSummarizer, synthetic_transcript
+from text_processor import TextProcessor
+
+
+class CountingSummarizer(StandInSummarizer):
+    """Stand-in summarizer that counts the chunks it is asked to summarize"""
+
+    def __init__(self):
+        super().__init__()
+        self.items = 0
+
+    def __call__(self, texts, **kwargs):
+        self.items += 1 if isinstance(texts, str) else len(texts)
+        return super().__call__(texts, **kwargs)
+
+
+def edit_one_word(text, rng):
+    """
+    Correct one random word, like fixing an ASR mistake: the replacement is
+    one or two words, so the token count of its sentence can change
+    """
+    words = text.split(' ')
+    i = int(rng.integers(0, len(words)))
+    punctuation = words[i][len(words[i].rstrip('.!?,')):]
+    replacement = [LECTURE_WORDS[int(j)] for j in rng.integers(0, len(LECTURE_WORDS), int(rng.integers(1, 3)))]
+    words[i] = ' '.join(replacement) + punctuation
+    return ' '.join(words)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--edits', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    model = CountingSummarizer()
+    get_registry().register("summarization", STAND_IN_SUMMARIZER, "cpu", model, "fp32")
+    processor = TextProcessor(key_terms=KeyTermIndex())
+    formatter = LLMFormatter(STAND_IN_SUMMARIZER, backend='fp32', cache=TieredCache(MemoryCache(4096)))
+
+    text = synthetic_transcript(args.minutes, args.seed)
+    t0 = time.perf_counter()
+    structured = processor.structure_content(text)
+    formatter.format_all_outputs(structured).as_dict()
+    full_seconds = time.perf_counter() - t0
+    full_items = model.items
+    print(f"{args.minutes:.0f}-minute lecture: {structured['num_sentences']} sentences, "
+          f"{structured['num_paragraphs']} paragraphs")
+    print(f"full run: {full_seconds:.3f}s, {full_items} summary chunks\n")
+
+    rng = np.random.default_rng(args.seed)
+    seconds, items, mismatches = [], [], 0
+    for _ in range(args.edits):
+        edited = edit_one_word(text, rng)
+        model.items = 0
+        t0 = time.perf_counter()
+        updated = processor.update_structure(structured, edited)
+        formatter.format_all_outputs(updated).as_dict()
+        seconds.append(time.perf_counter() - t0)
+        items.append(model.items)
+
+        reference = processor.structure_content(edited)
+        if not np.array_equal(updated.sentence_spans, reference.sentence_spans) or \
+                updated['entities'] != reference['entities']:
+            mismatches += 1
+        text, structured = edited, updated
+
+    print(f"one-word edits: {len(seconds)}, reprocess mean {np.mean(seconds):.3f}s, max {max(seconds):.3f}s")
+    print(f"summary chunks regenerated per edit: mean {np.mean(items):.1f}, max {max(items)} (of {full_items})")
+    print(f"structure mismatches vs full run: {mismatches}")
+    failed = mismatches > 0 or max(seconds) > 1.0
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
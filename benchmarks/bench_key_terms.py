@@ -0,0 +1,87 @@
+"""
+Key-term extraction benchmark
+Times KeyTermIndex.extract on synthetic transcripts of growing length and
+checks that cost per word stays flat (linear scaling) up to 100k words, for
+in-memory IDF statistics, for the SQLite stats file the app uses, and for a
+stats file small enough that every lecture trims the vocabulary
+
+Usage:
+    python benchmarks/bench_key_terms.py [--sizes 10000,25000,50000,100000] [--trim-terms 1000]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from key_terms import KeyTermIndex
+
+
+def synthetic_sentences(num_words, seed=0, words_per_sentence=15):
+    """Zipf-distributed vocabulary, roughly like spoken lecture text"""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"term{i}" for i in range(20000)])
+    ids = np.minimum(rng.zipf(1.2, size=num_words) - 1, len(vocab) - 1)
+    words = vocab[ids]
+    return [
+        ' '.join(words[i:i + words_per_sentence]) + '.'
+        for i in range(0, num_words, words_per_sentence)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,25000,50000,100000')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--max-ratio', type=float, default=2.0,
+                        help="Fail if per-word cost at the largest size exceeds the smallest by this factor")
+    parser.add_argument('--trim-terms', type=int, default=1000,
+                        help="Vocabulary cap of the trimming run (below the terms of every size)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    modes = (('memory', None), ('sqlite', KeyTermIndex().max_terms), ('sqlite+trim', args.trim_terms))
+    # Load scikit-learn before timing anything
+    KeyTermIndex().extract(synthetic_sentences(1000))
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, max_terms in modes:
+            per_word = []
+            print(f"\n{mode}")
+            print(f"{'words':>8} {'seconds':>9} {'us/word':>9} {'stored terms':>13}")
+            for size in sizes:
+                sentences = synthetic_sentences(size)
+                best = float('inf')
+                for repeat in range(args.repeats):
+                    # A fresh stats file each time, so the lecture is counted (upserted) again
+                    path = os.path.join(tmp, f"{mode}-{size}-{repeat}.sqlite") if max_terms else None
+                    index = KeyTermIndex(stats_path=path, max_terms=max_terms or KeyTermIndex().max_terms)
+                    t0 = time.perf_counter()
+                    index.extract(sentences)
+                    best = min(best, time.perf_counter() - t0)
+                stored = len(index.doc_freq)
+                if path:
+                    with sqlite3.connect(path) as conn:
+                        stored = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+                    if stored > max_terms:
+                        print(f"FAIL: {stored} terms stored, cap is {max_terms}")
+                        failed = True
+                per_word.append(best / size)
+                print(f"{size:>8} {best:>9.3f} {best / size * 1e6:>9.2f} {stored:>13}")
+
+            ratio = per_word[-1] / per_word[0]
+            print(f"per-word cost ratio {sizes[-1]} vs {sizes[0]} words: {ratio:.2f}")
+            if ratio > args.max_ratio:
+                print(f"FAIL: key-term extraction ({mode}) is scaling worse than linear")
+                failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
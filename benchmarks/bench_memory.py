@@ -0,0 +1,86 @@
+"""
+Peak memory benchmark
+Transcribes a long synthetic lecture (2 hours by default) from disk with the
+stand-in ASR in a fresh interpreter and reports its peak resident set size.
+Streaming keeps memory bounded by the window length, not the lecture length,
+so the run fails if the peak grows past the ceiling over what the process
+held after imports and model load (--window 0 loads the whole file, for
+comparison).
+
+Usage:
+    python benchmarks/bench_memory.py [--minutes 120] [--window 300] [--max-growth-mb 150]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.append(BENCH_DIR)
+
+from run_benchmarks import synthetic_audio
+
+PROBE = """
+import json, resource, sys
+sys.path[:0] = [{src!r}, {bench!r}]
+from run_benchmarks import STAND_IN_ASR, register_stand_ins
+from stt_engine import SpeechToTextEngine
+
+def peak_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+register_stand_ins()
+engine = SpeechToTextEngine(STAND_IN_ASR, batch_size=1, backend='fp32')
+before = peak_mb()
+result = engine.transcribe({path!r}, {window!r})
+print(json.dumps({{'status': result['status'], 'error': result.get('error'), 'duration': result.get('duration'),
+                   'before_mb': before, 'peak_mb': peak_mb()}}))
+"""
+
+
+def measure(path, window_s):
+    """Peak RSS of a fresh interpreter transcribing `path`"""
+    code = PROBE.format(src=os.path.abspath(os.path.join(BENCH_DIR, '..', 'src')), bench=BENCH_DIR,
+                        path=path, window=window_s)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=120)
+    parser.add_argument('--window', type=float, default=300,
+                        help="Seconds per window (transcribe's default; 0 = whole file)")
+    parser.add_argument('--max-growth-mb', type=float, default=150,
+                        help="Fail if peak RSS rises more than this above the post-load level")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lecture.wav')
+        synthetic_audio(path, args.minutes)
+        size_mb = os.path.getsize(path) / 2 ** 20
+        result = measure(path, args.window or None)
+
+    if result['status'] != 'success':
+        print(f"transcription failed: {result['error']}")
+        print("FAIL")
+        return 1
+    growth = result['peak_mb'] - result['before_mb']
+    windows = f"{args.window:.0f}s windows" if args.window else "whole file"
+    print(f"{args.minutes:.0f}-minute lecture ({size_mb:.0f} MB 16kHz WAV), {windows}")
+    print(f"after imports and model load: {result['before_mb']:.0f} MB")
+    print(f"peak RSS: {result['peak_mb']:.0f} MB, +{growth:.0f} MB while transcribing "
+          f"(ceiling +{args.max_growth_mb:.0f} MB)")
+    failed = growth > args.max_growth_mb
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
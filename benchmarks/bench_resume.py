@@ -0,0 +1,146 @@
+"""
+Resume-after-crash check
+Transcribes a synthetic lecture with checkpoints in a child process whose
+stand-in ASR calls os._exit partway through, as if the machine died. The
+run is then resumed in this process, and its segments must equal those of an
+uninterrupted run, with only the unfinished windows sent to the model again.
+Exits non-zero on any mismatch.
+
+Usage:
+    python benchmarks/bench_resume.py [--minutes 10] [--window 60] [--kill-at 4] [--formats wav,flac]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+import soundfile as sf
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.append(BENCH_DIR)
+
+from checkpoints import CheckpointStore
+from inference_backends import BACKENDS
+from model_registry import get_registry
+from run_benchmarks import STAND_IN_ASR, StandInASR, synthetic_audio
+from stt_engine import SpeechToTextEngine
+
+# Exit status of the child that "crashes"
+KILLED = 17
+
+
+class CountingASR(StandInASR):
+    """Stand-in ASR that counts its calls and kills the process on call `kill_at`"""
+
+    def __init__(self, kill_at=None):
+        super().__init__()
+        self.kill_at = kill_at
+        self.calls = 0
+
+    def __call__(self, audio, **kwargs):
+        self.calls += 1
+        if self.calls == self.kill_at:
+            os._exit(KILLED)
+        return super().__call__(audio, **kwargs)
+
+
+def register_asr(model):
+    registry = get_registry()
+    for backend in BACKENDS:
+        registry.register("automatic-speech-recognition", STAND_IN_ASR, "cpu", model, backend)
+
+
+def make_engine(checkpoints_path=None):
+    checkpoints = CheckpointStore(checkpoints_path) if checkpoints_path else None
+    return SpeechToTextEngine(STAND_IN_ASR, batch_size=1, backend='fp32', checkpoints=checkpoints)
+
+
+def load_audio(path, as_bytes):
+    if not as_bytes:
+        return path
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def interrupted_run(path, as_bytes, checkpoints_path, window_s, kill_at):
+    """Child process: transcribe until the stand-in kills it"""
+    register_asr(CountingASR(kill_at))
+    make_engine(checkpoints_path).transcribe(load_audio(path, as_bytes), window_s)
+
+
+def write_audio(path, minutes):
+    """16kHz WAV as written by run_benchmarks, or stereo 44.1kHz FLAC (resampled on read)"""
+    if path.endswith('.wav'):
+        synthetic_audio(path, minutes)
+        return
+    rng = np.random.default_rng(0)
+    with sf.SoundFile(path, 'w', samplerate=44100, channels=2, format='FLAC') as f:
+        for _ in range(int(minutes * 6)):
+            block = rng.normal(0, 0.05, 10 * 44100).astype(np.float32)
+            f.write(np.stack([block, block], axis=1))
+
+
+def check(path, as_bytes, workdir, window_s, kill_at):
+    """Kill, resume and compare one input; returns a list of problems"""
+    register_asr(CountingASR())
+    reference = make_engine().transcribe(load_audio(path, as_bytes), window_s)
+    if reference['status'] != 'success':
+        return [f"reference run failed: {reference['error']}"]
+
+    checkpoints_path = os.path.join(workdir, f"checkpoints-{os.path.basename(path)}-{as_bytes}.sqlite")
+    child = multiprocessing.get_context('spawn').Process(
+        target=interrupted_run, args=(path, as_bytes, checkpoints_path, window_s, kill_at)
+    )
+    child.start()
+    child.join()
+    if child.exitcode != KILLED:
+        return [f"interrupted run exited with {child.exitcode}, expected {KILLED}"]
+
+    model = CountingASR()
+    register_asr(model)
+    resumed = make_engine(checkpoints_path).transcribe(load_audio(path, as_bytes), window_s)
+    if resumed['status'] != 'success':
+        return [f"resumed run failed: {resumed['error']}"]
+
+    problems = []
+    windows = int(np.ceil(reference['duration'] / window_s))
+    if resumed['resumed_windows'] != kill_at - 1:
+        problems.append(f"resumed {resumed['resumed_windows']} windows, expected {kill_at - 1}")
+    if model.calls != windows - (kill_at - 1):
+        problems.append(f"{model.calls} model calls after resuming, expected {windows - (kill_at - 1)}")
+    if resumed['segments'] != reference['segments']:
+        problems.append("segments differ from the uninterrupted run")
+    if resumed['text'] != reference['text']:
+        problems.append("text differs from the uninterrupted run")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--window', type=float, default=60)
+    parser.add_argument('--kill-at', type=int, default=4, help="Model call (window) during which the run dies")
+    parser.add_argument('--formats', default='wav,flac')
+    args = parser.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in args.formats.split(','):
+            path = os.path.join(tmp, f'lecture.{ext}')
+            write_audio(path, args.minutes)
+            for as_bytes in (False, True):
+                source = 'bytes' if as_bytes else 'path'
+                problems = check(path, as_bytes, tmp, args.window, args.kill_at)
+                failed |= bool(problems)
+                print(f"{ext:<5} {source:<6} {'; '.join(problems) or 'ok'}")
+
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Sharded transcription benchmark
+Transcribes a synthetic lecture whose "words" are encoded as tones (one per
+half second), so a stand-in ASR can recognise them exactly. The sharded
+transcript must match the single-process one word for word: any word
+repeated or dropped at a shard boundary fails the run. Wall time is reported
+per worker count to show scaling.
+
+Usage:
+    python benchmarks/bench_sharding.py [--minutes 8] [--workers 1,2,4] [--cost 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+
+from inference_backends import BACKENDS
+from model_registry import get_registry
+from stt_engine import SpeechToTextEngine
+
+TONE_ASR = "stand-in/tone-whisper"
+SAMPLE_RATE = 16000
+WORD_S = 0.5
+WORDS_PER_SEGMENT = 6
+VOCABULARY = [f"w{i:02d}" for i in range(48)]
+BASE_HZ = 300.0
+STEP_HZ = 50.0
+
+
+class ToneASR:
+    """
+    Stand-in whisper that hears one word per half-second tone
+    Emits segments of several words with window-relative timestamps, like the
+    real pipeline; cost repeats the FFT work to make each call CPU-heavy
+    """
+
+    def __init__(self, cost=1):
+        self.cost = cost
+
+    def __call__(self, audio, chunk_length_s=30, batch_size=1, **kwargs):
+        block = int(WORD_S * SAMPLE_RATE)
+        frames = audio[:len(audio) // block * block].reshape(-1, block)
+        for _ in range(self.cost):
+            spectrum = np.abs(np.fft.rfft(frames, axis=1))
+        freqs = np.fft.rfftfreq(block, 1 / SAMPLE_RATE)
+        words = [VOCABULARY[int(round((freqs[i] - BASE_HZ) / STEP_HZ)) % len(VOCABULARY)]
+                 for i in spectrum.argmax(axis=1)]
+        chunks = []
+        for i in range(0, len(words), WORDS_PER_SEGMENT):
+            group = words[i:i + WORDS_PER_SEGMENT]
+            chunks.append({'text': ' ' + ' '.join(group), 'timestamp': (i * WORD_S, (i + len(group)) * WORD_S)})
+        return {'text': ''.join(c['text'] for c in chunks), 'chunks': chunks}
+
+
+def register_tone_asr(cost=1):
+    """Worker initializer: put the stand-in in this process's registry"""
+    registry = get_registry()
+    for backend in BACKENDS:
+        registry.register("automatic-speech-recognition", TONE_ASR, "cpu", ToneASR(cost), backend)
+
+
+class _Init:
+    """Picklable worker_init carrying the cost setting into spawned workers"""
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def __call__(self):
+        register_tone_asr(self.cost)
+
+
+def tone_audio(path, minutes, seed=0):
+    """A random word sequence, one tone per WORD_S seconds"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(WORD_S * SAMPLE_RATE)) / SAMPLE_RATE
+    with sf.SoundFile(path, 'w', samplerate=SAMPLE_RATE, channels=1, subtype='PCM_16') as f:
+        for word in rng.integers(0, len(VOCABULARY), int(minutes * 60 / WORD_S)):
+            f.write((0.3 * np.sin(2 * np.pi * (BASE_HZ + STEP_HZ * word) * t)).astype(np.float32))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=8)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--cost', type=int, default=20, help="FFT repeats per call (stand-in model cost)")
+    parser.add_argument('--window', type=float, default=60)
+    args = parser.parse_args(argv)
+
+    register_tone_asr(args.cost)
+    engine = SpeechToTextEngine(TONE_ASR, batch_size=1, backend='fp32')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lecture.wav')
+        tone_audio(path, args.minutes)
+
+        t0 = time.perf_counter()
+        reference = engine.transcribe(path, args.window)
+        base = time.perf_counter() - t0
+        expected = reference['text'].split()
+        print(f"{'workers':>7} {'shards':>6} {'seconds':>8} {'speedup':>8}  words")
+        print(f"{'-':>7} {1:>6} {base:>8.2f} {1.0:>8.2f}  {len(expected)} (single process)")
+
+        failed = False
+        worker_init = _Init(args.cost)
+        for workers in (int(w) for w in args.workers.split(',')):
+            # First call starts the pool; time the second, which reuses it
+            engine.transcribe_sharded(path, workers, args.window, worker_init=worker_init, threads=1)
+            t0 = time.perf_counter()
+            result = engine.transcribe_sharded(path, workers, args.window, worker_init=worker_init, threads=1)
+            seconds = time.perf_counter() - t0
+            if result['status'] != 'success':
+                print(f"{workers:>7} FAILED: {result['error']}")
+                failed = True
+                continue
+            words = result['text'].split()
+            starts = [seg['start'] for seg in result['segments']]
+            ordered = starts == sorted(starts) and len(result['segments']) >= len(reference['segments'])
+            match = 'ok' if words == expected else f'MISMATCH ({len(words)} words)'
+            if not ordered:
+                match += ', segments merged or out of order'
+            failed |= words != expected or not ordered
+            print(f"{workers:>7} {result['shards']:>6} {seconds:>8.2f} {base / seconds:>8.2f}  {match}")
+
+    engine.close()
+    print(f"\n{os.cpu_count()} CPU(s) available")
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
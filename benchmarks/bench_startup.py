@@ -0,0 +1,77 @@
+"""
+Cold-start benchmark
+Imports each module app.py and cli.py load in a fresh interpreter and times it,
+and fails if torch, transformers, scikit-learn or NLTK get imported before the
+first stage that needs them
+
+Usage:
+    python benchmarks/bench_startup.py [--repeats 5] [--max-seconds 1.0]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+
+# What app.py imports before rendering the first page
+STARTUP_MODULES = ('stt_engine', 'text_processor', 'llm_formatter', 'job_queue', 'search_index')
+
+# Heavy packages that must only load when a model or stage is first used
+DEFERRED = ('torch', 'transformers', 'sklearn', 'nltk')
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+seconds = time.perf_counter() - t0
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(modules, repeats):
+    """Best import time over fresh interpreters, plus the deferred packages it loaded"""
+    code = PROBE.format(src=os.path.abspath(SRC_DIR), modules=tuple(modules), deferred=DEFERRED)
+    best = None
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=1.0,
+                        help="Fail if importing everything app.py needs takes longer than this")
+    args = parser.parse_args(argv)
+
+    eager = set()
+    print(f"{'module':<16} {'seconds':>9}  deferred packages loaded")
+    for name in STARTUP_MODULES + ('(all)',):
+        modules = STARTUP_MODULES if name == '(all)' else (name,)
+        result = time_import(modules, args.repeats)
+        eager.update(result['loaded'])
+        print(f"{name:<16} {result['seconds']:>9.3f}  {', '.join(result['loaded']) or '-'}")
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported at startup: {', '.join(sorted(eager))}")
+        failed = True
+    if result['seconds'] > args.max_seconds:
+        print(f"\nFAIL: startup imports took {result['seconds']:.2f}s (limit {args.max_seconds:.2f}s)")
+        failed = True
+    if not failed:
+        print("\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
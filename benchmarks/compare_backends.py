@@ -0,0 +1,157 @@
+"""
+Lecture AI - Inference backend comparison
+Runs whisper (SpeechToTextEngine) and BART (LLMFormatter) under each CPU
+backend on the same lecture and reports latency, model size and output drift
+against fp32, to choose a backend per deployment. Needs the real models.
+
+Usage:
+    python benchmarks/compare_backends.py lecture.wav
+    python benchmarks/compare_backends.py lecture.wav --backends fp32,int8 --repeats 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+
+from inference_backends import BACKENDS
+from llm_formatter import LLMFormatter
+from model_registry import estimate_pipeline_bytes
+from stt_engine import SpeechToTextEngine
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def best_of(fn, repeats):
+    """(best wall time, last result) over `repeats` runs"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def measure(name, build, run, repeats):
+    """Load time, model size, best latency and output of one component/backend"""
+    t0 = time.perf_counter()
+    component = build()
+    load_seconds = time.perf_counter() - t0
+    pipe = component.pipe if hasattr(component, 'pipe') else component.summarizer
+    seconds, output = best_of(lambda: run(component), repeats)
+    print(f"  {name:<14} load {load_seconds:7.1f}s   run {seconds:8.2f}s")
+    return {
+        'load_seconds': load_seconds,
+        'seconds': seconds,
+        'model_mb': estimate_pipeline_bytes(pipe) / (1024 * 1024),
+        'output': output
+    }
+
+
+def compare_component(label, backends, build, run, repeats):
+    """Results per backend, with speedup and WER-style drift relative to fp32"""
+    print(f"\n== {label} ==")
+    results = {}
+    for backend in backends:
+        try:
+            results[backend] = measure(backend, lambda: build(backend), run, repeats)
+        except Exception as e:
+            print(f"  {backend:<14} FAILED - {e}")
+            results[backend] = {'error': str(e)}
+
+    reference = results.get('fp32', {})
+    for backend, result in results.items():
+        if 'error' in result or 'output' not in reference:
+            continue
+        result['speedup'] = reference['seconds'] / result['seconds'] if result['seconds'] > 0 else 0.0
+        result['drift_wer'] = word_error_rate(reference['output'], result['output'])
+    return results
+
+
+def print_table(label, results):
+    print(f"\n{label}: backend      latency   speedup   size MB   drift (WER vs fp32)")
+    for backend, r in results.items():
+        if 'error' in r:
+            print(f"  {backend:<18} error: {r['error']}")
+            continue
+        speedup = f"{r['speedup']:.2f}x" if 'speedup' in r else '-'
+        drift = f"{r['drift_wer']:.3f}" if 'drift_wer' in r else '-'
+        print(f"  {backend:<18} {r['seconds']:7.2f}s  {speedup:>8}  {r['model_mb']:8.0f}   {drift}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare fp32 / int8 / onnx inference backends")
+    parser.add_argument('audio', help="Lecture recording used for both models")
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--whisper-model', default='openai/whisper-tiny')
+    parser.add_argument('--summary-model', default='facebook/bart-large-cnn')
+    parser.add_argument('--text', help="Text to summarize (default: the fp32 transcript)")
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'backends.json'))
+    args = parser.parse_args(argv)
+
+    backends = args.backends.split(',')
+    if 'fp32' not in backends:
+        backends.insert(0, 'fp32')
+
+    def transcribe(stt):
+        result = stt.transcribe(args.audio)
+        if result['status'] != 'success':
+            raise RuntimeError(result.get('error'))
+        return result['text']
+
+    asr = compare_component(
+        'whisper', backends,
+        lambda backend: SpeechToTextEngine(model_name=args.whisper_model, backend=backend),
+        transcribe, args.repeats
+    )
+
+    if args.text:
+        with open(args.text, encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = asr['fp32'].get('output', '')
+    summary = compare_component(
+        'bart', backends,
+        lambda backend: LLMFormatter(model_name=args.summary_model, backend=backend),
+        lambda formatter: formatter.generate_summary(text), args.repeats
+    )
+
+    print_table('whisper', asr)
+    print_table('bart', summary)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'audio': os.path.abspath(args.audio),
+        'whisper': asr,
+        'bart': summary
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
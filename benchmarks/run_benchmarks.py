@@ -0,0 +1,276 @@
+"""
+Lecture AI - Per-stage benchmark suite
+Times SpeechToTextEngine.transcribe and every TextProcessor / LLMFormatter
+method on synthetic lectures of several lengths, using small local stand-in
+models so it runs offline. Results are written as JSON and compared with a
+stored baseline; the run fails if any stage regresses past the tolerance, or
+if there is no baseline yet (record one with --update-baseline).
+
+Usage:
+    python benchmarks/run_benchmarks.py                    # compare with baseline
+    python benchmarks/run_benchmarks.py --update-baseline  # record a new baseline
+    python benchmarks/run_benchmarks.py --sizes 1,10       # quicker run
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+
+from inference_backends import BACKENDS
+from key_terms import KeyTermIndex
+from llm_formatter import LLMFormatter
+from model_registry import get_registry
+from stt_engine import SpeechToTextEngine
+from text_processor import TextProcessor
+
+STAND_IN_ASR = "stand-in/whisper"
+STAND_IN_SUMMARIZER = "stand-in/bart"
+SAMPLE_RATE = 16000
+WORDS_PER_MINUTE = 150
+
+LECTURE_WORDS = (
+    "the gradient of the loss function tells us which direction reduces error "
+    "so we update every parameter with a small learning rate and repeat "
+    "Newton showed that force equals mass times acceleration in an inertial frame "
+    "a matrix is invertible when its determinant is not zero "
+    "entropy measures the uncertainty of a random variable in bits "
+    "the enzyme lowers the activation energy of the reaction "
+    "supply and demand curves meet at the equilibrium price"
+).split()
+
+
+class StandInASR:
+    """
+    Offline stand-in for the whisper pipeline
+    Does a small amount of real work per 30s chunk (framed FFT) so decode,
+    windowing, VAD and batching overheads stay visible in the timings
+    """
+
+    def __init__(self, words_per_second=2.5):
+        self.words_per_second = words_per_second
+
+    def __call__(self, audio, chunk_length_s=30, batch_size=1, **kwargs):
+        chunk_len = int(chunk_length_s * SAMPLE_RATE)
+        chunks = []
+        for start in range(0, max(len(audio), 1), chunk_len):
+            piece = audio[start:start + chunk_len]
+            if len(piece) >= 400:
+                frames = piece[:len(piece) // 400 * 400].reshape(-1, 400)
+                np.abs(np.fft.rfft(frames, axis=1)).sum()
+            seconds = len(piece) / SAMPLE_RATE
+            words = ' '.join(LECTURE_WORDS[i % len(LECTURE_WORDS)]
+                             for i in range(int(seconds * self.words_per_second)))
+            chunks.append({
+                'text': ' ' + words,
+                'timestamp': (start / SAMPLE_RATE, (start + len(piece)) / SAMPLE_RATE)
+            })
+        return {'text': ''.join(c['text'] for c in chunks), 'chunks': chunks}
+
+
+class StandInTokenizer:
+    """Whitespace tokenizer with the slice of the fast-tokenizer API the formatter uses"""
+
+    model_max_length = 1024
+    _token = re.compile(r'\S+')
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        ids, offsets = [], []
+        for text in texts:
+            spans = [m.span() for m in self._token.finditer(text)]
+            ids.append(list(range(len(spans))))
+            offsets.append(spans)
+        encoded = {'input_ids': ids}
+        if return_offsets_mapping:
+            encoded['offset_mapping'] = offsets
+        return encoded
+
+
+class StandInSummarizer:
+    """Offline stand-in for the BART pipeline: keeps the leading words"""
+
+    def __init__(self):
+        self.tokenizer = StandInTokenizer()
+
+    def __call__(self, texts, max_length=200, min_length=0, **kwargs):
+        single = isinstance(texts, str)
+        outputs = [{'summary_text': ' '.join(t.split()[:max_length])} for t in ([texts] if single else texts)]
+        return outputs
+
+
+def register_stand_ins():
+    """Put the stand-in models in the shared registry under every device and backend name"""
+    registry = get_registry()
+    for device in ('cpu', 'cuda'):
+        for backend in BACKENDS:
+            registry.register("automatic-speech-recognition", STAND_IN_ASR, device, StandInASR(), backend)
+            registry.register("summarization", STAND_IN_SUMMARIZER, device, StandInSummarizer(), backend)
+
+
+def synthetic_audio(path, minutes, seed=0):
+    """Speech-like bursts separated by pauses, written in blocks (16kHz mono)"""
+    rng = np.random.default_rng(seed)
+    with sf.SoundFile(path, 'w', samplerate=SAMPLE_RATE, channels=1, subtype='PCM_16') as f:
+        for _ in range(int(minutes * 60 / 10)):
+            block = rng.normal(0, 0.002, 10 * SAMPLE_RATE).astype(np.float32)
+            speech = int(rng.uniform(5, 9) * SAMPLE_RATE)
+            t = np.arange(speech) / SAMPLE_RATE
+            block[:speech] += (0.2 * np.sin(2 * np.pi * 180 * t) * rng.uniform(0.5, 1, speech)).astype(np.float32)
+            f.write(block)
+
+
+def synthetic_transcript(minutes, seed=0):
+    """About WORDS_PER_MINUTE words per minute, in sentences of 8-20 words"""
+    rng = np.random.default_rng(seed)
+    num_words = int(minutes * WORDS_PER_MINUTE)
+    words = [LECTURE_WORDS[i] for i in rng.integers(0, len(LECTURE_WORDS), num_words)]
+    sentences = []
+    i = 0
+    while i < num_words:
+        n = int(rng.integers(8, 21))
+        sentence = ' '.join(words[i:i + n])
+        sentences.append(sentence[:1].upper() + sentence[1:] + '.')
+        i += n
+    return ' '.join(sentences)
+
+
+def transcribe_or_fail(stt, audio_path):
+    """Transcribe, raising instead of timing a failed run"""
+    result = stt.transcribe(audio_path)
+    if result['status'] != 'success':
+        raise RuntimeError(result.get('error'))
+    return result
+
+
+def time_stage(fn, repeats):
+    """Best wall time of `repeats` runs (best-of filters scheduler noise)"""
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_suite(sizes, repeats, workdir):
+    """Return {stage: {minutes: seconds}}"""
+    register_stand_ins()
+    stt = SpeechToTextEngine(model_name=STAND_IN_ASR)
+    stt_vad = SpeechToTextEngine(model_name=STAND_IN_ASR, vad=True)
+    # In-memory IDF stats so benchmark text never leaks into the real ones
+    processor = TextProcessor(key_terms=KeyTermIndex())
+    formatter = LLMFormatter(model_name=STAND_IN_SUMMARIZER)
+
+    results = {}
+
+    def record(stage, minutes, seconds):
+        results.setdefault(stage, {})[str(minutes)] = seconds
+        print(f"  {stage:<32} {seconds:>9.4f}s")
+
+    for minutes in sizes:
+        print(f"\n== {minutes} min lecture ==")
+        audio_path = os.path.join(workdir, f"lecture_{minutes}min.wav")
+        synthetic_audio(audio_path, minutes)
+        record('stt.transcribe', minutes, time_stage(lambda: transcribe_or_fail(stt, audio_path), repeats))
+        record('stt.transcribe[vad]', minutes, time_stage(lambda: transcribe_or_fail(stt_vad, audio_path), repeats))
+        os.remove(audio_path)
+
+        text = synthetic_transcript(minutes)
+        cleaned = processor.clean_text(text)
+        structured = processor.structure_content(text)
+        text_stages = {
+            'text.clean_text': lambda: processor.clean_text(text),
+            'text.segment_sentences': lambda: processor.segment_sentences(cleaned),
+            'text.segment_paragraphs': lambda: processor.segment_paragraphs(cleaned),
+            'text.extract_key_entities': lambda: processor.extract_key_entities(cleaned),
+            'text.structure_content': lambda: processor.structure_content(text),
+            'llm.generate_summary': lambda: formatter.generate_summary(cleaned),
+            'llm.generate_summary[fast]': lambda: formatter.generate_summary(
+                cleaned, mode='fast', sentences=structured['sentences']),
+            'llm.generate_flashcards': lambda: formatter.generate_flashcards(structured['paragraphs']),
+            'llm.generate_structured_notes': lambda: formatter.generate_structured_notes(structured),
+            'llm.format_all_outputs': lambda: formatter.format_all_outputs(structured).as_dict(),
+        }
+        for stage, fn in text_stages.items():
+            record(stage, minutes, time_stage(fn, repeats))
+
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """List of (stage, minutes, baseline, current) that regressed"""
+    regressions = []
+    for stage, by_size in results.items():
+        for minutes, seconds in by_size.items():
+            before = baseline.get(stage, {}).get(minutes)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > min_delta:
+                regressions.append((stage, minutes, before, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage Lecture AI benchmarks")
+    parser.add_argument('--sizes', default='1,10,30,120', help="Lecture lengths in minutes")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'))
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument('--min-delta', type=float, default=0.02,
+                        help="Ignore regressions smaller than this many seconds")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    sizes = [float(s) if '.' in s else int(s) for s in args.sizes.split(',')]
+    with tempfile.TemporaryDirectory(prefix='lecture_ai_bench_') as workdir:
+        results = run_suite(sizes, args.repeats, workdir)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'stages': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        # Passing here would let a regressed run become the reference
+        print(f"\nNo baseline at {args.baseline}; record one on this machine with --update-baseline")
+        return 1
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['stages']
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for stage, minutes, before, after in regressions:
+            print(f"  {stage} @ {minutes} min: {before:.4f}s -> {after:.4f}s ({after / before:.2f}x)")
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Lecture AI - Batch CLI
+Process a directory (or manifest) of lecture recordings without the UI
+
+Usage:
+    python cli.py lectures/ --output-dir results/ --workers 4
+    python cli.py manifest.txt --output-dir results/
+    python cli.py lectures/ --shards 4   # split each long lecture across 4 processes
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.m4a', '.flac')
+
+# Per-worker pipeline, built once by the pool initializer
+_worker = {}
+
+
+def find_inputs(source):
+    """
+    Collect audio files from a directory (recursive) or a manifest
+    A manifest is a .json list of paths or a text file with one path per line
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths), source
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding='utf-8') as f:
+        if source.endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [os.path.join(base, p) for p in entries], base
+
+
+def output_stem(path, root):
+    """Output name that stays unique for same-named files in different folders"""
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    stem = os.path.splitext(rel)[0]
+    return stem.replace(os.sep, '__').replace('..', '_')
+
+
+def _init_worker(model_name, vad, batch_size, use_cache, threads, profile, backend, use_index, shards=1):
+    """Load models once per worker process"""
+    import torch
+    from checkpoints import default_checkpoints
+    from llm_formatter import LLMFormatter, default_summary_cache
+    from search_index import default_search_index
+    from stt_engine import SpeechToTextEngine, default_transcript_cache
+    from text_processor import TextProcessor
+
+    # Split the cores between workers instead of oversubscribing them
+    torch.set_num_threads(threads)
+
+    _worker['stt'] = SpeechToTextEngine(
+        model_name=model_name,
+        batch_size=batch_size,
+        vad=vad,
+        cache=default_transcript_cache() if use_cache else None,
+        checkpoints=default_checkpoints() if use_cache else None,
+        profile=profile,
+        backend=backend
+    )
+    _worker['shards'] = shards
+    _worker['threads'] = threads
+    _worker['processor'] = TextProcessor(profile=profile)
+    _worker['index'] = default_search_index() if use_index else None
+    _worker['formatter'] = LLMFormatter(
+        profile=profile,
+        backend=backend,
+        cache=default_summary_cache() if use_cache else None
+    )
+
+
+def render_markdown(title, result):
+    """Human-readable study material for one lecture"""
+    outputs = result['outputs']
+    parts = [f"# {title}\n\n", "## 📝 Summary\n\n", outputs['summary'], "\n\n"]
+    parts.append(outputs['notes'])
+    parts.append("\n\n## 🧠 Flashcards\n")
+    for card in outputs['flashcards']:
+        parts.append(f"\n**Q{card['id']}. {card['question']}**\n\n{card['answer']}\n")
+    return ''.join(parts)
+
+
+def _write_atomic(path, content):
+    """Write via a temp file so an interrupted run never leaves a 'done' output"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def process_file(audio_path, out_base, formats, summary_mode='abstractive'):
+    """Run transcribe -> structure -> outputs for one lecture (in a worker)"""
+    t0 = time.perf_counter()
+    if _worker['shards'] > 1:
+        transcript = _worker['stt'].transcribe_sharded(
+            audio_path, _worker['shards'], threads=_worker['threads']
+        )
+    else:
+        transcript = _worker['stt'].transcribe(audio_path)
+    if transcript['status'] != 'success':
+        return {'path': audio_path, 'status': 'failed', 'error': transcript.get('error')}
+
+    structured = _worker['processor'].structure_content(transcript['text'])
+    if _worker['index'] is not None:
+        from search_index import lecture_id_for
+        _worker['index'].add_lecture(
+            lecture_id_for(structured['cleaned']), os.path.basename(audio_path), structured,
+            transcript['segments'], transcript['duration']
+        )
+    outputs = _worker['formatter'].format_all_outputs(structured, summary_mode=summary_mode).as_dict()
+    elapsed = time.perf_counter() - t0
+
+    result = {
+        'source': os.path.abspath(audio_path),
+        'transcript': transcript['text'],
+        'segments': transcript['segments'],
+        'duration': transcript['duration'],
+        'structure': {
+            'num_sentences': structured['num_sentences'],
+            'num_paragraphs': structured['num_paragraphs'],
+            'entities': [list(entity) for entity in structured['entities']],
+            'paragraphs': list(structured['paragraphs'])
+        },
+        'outputs': outputs,
+        'processing_seconds': elapsed,
+        'profile': {
+            'stt': transcript.get('profile', []),
+            'text': structured['profile'],
+            'llm': outputs['profile']
+        }
+    }
+
+    # Markdown first: the JSON file marks the lecture as done
+    if 'md' in formats:
+        title = os.path.splitext(os.path.basename(audio_path))[0]
+        _write_atomic(out_base + '.md', render_markdown(title, result))
+    _write_atomic(out_base + '.json', json.dumps(result, ensure_ascii=False, indent=2))
+
+    return {
+        'path': audio_path,
+        'status': 'success',
+        'audio_seconds': transcript['duration'],
+        'seconds': elapsed,
+        'cached_transcript': transcript.get('cached', False)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-process lecture recordings")
+    parser.add_argument('source', help="Directory of audio files or a manifest (.txt/.json)")
+    parser.add_argument('--output-dir', default='lecture_ai_output', help="Where results are written")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (each loads the models once)")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Split each lecture into this many time shards transcribed in parallel")
+    parser.add_argument('--model', default='openai/whisper-tiny', help="Whisper model name")
+    parser.add_argument('--batch-size', type=int, default=None, help="Whisper chunk batch size (default: auto)")
+    parser.add_argument('--vad', action='store_true', help="Skip silence before transcription")
+    parser.add_argument('--format', default='json,md', help="Comma-separated outputs: json, md (json is always written)")
+    parser.add_argument('--no-cache', action='store_true', help="Don't use the transcript and summary caches")
+    parser.add_argument('--no-index', action='store_true', help="Don't add lectures to the search index")
+    parser.add_argument('--force', action='store_true', help="Reprocess lectures that already have results")
+    parser.add_argument('--profile', action='store_true', help="Record per-stage timings in the JSON output")
+    parser.add_argument('--summary-mode', choices=('abstractive', 'fast'), default='abstractive',
+                        help="BART summary, or a fast extractive one for previews and bulk runs")
+    parser.add_argument('--backend', choices=('fp32', 'int8', 'onnx'), default=None,
+                        help="CPU inference backend (default: LECTURE_AI_BACKEND or fp32)")
+    args = parser.parse_args(argv)
+
+    paths, root = find_inputs(args.source)
+    os.makedirs(args.output_dir, exist_ok=True)
+    formats = set(args.format.split(','))
+
+    todo = []
+    for path in paths:
+        out_base = os.path.join(args.output_dir, output_stem(path, root))
+        if not args.force and os.path.exists(out_base + '.json'):
+            print(f"skip  {path} (already done)")
+            continue
+        todo.append((path, out_base))
+
+    print(f"{len(todo)} to process, {len(paths) - len(todo)} already done, {args.workers} workers")
+    if not todo:
+        return 0
+
+    cores = os.cpu_count() or 1
+    threads = max(1, cores // (args.workers * max(1, args.shards)))
+    ctx = multiprocessing.get_context('spawn')
+    wall_start = time.perf_counter()
+    reports = []
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(args.model, args.vad, args.batch_size, not args.no_cache, threads, args.profile or None,
+                  args.backend, not args.no_index, args.shards)
+    ) as pool:
+        futures = {
+            pool.submit(process_file, path, out_base, formats, args.summary_mode): path
+            for path, out_base in todo
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                report = future.result()
+            except Exception as e:
+                report = {'path': futures[future], 'status': 'failed', 'error': str(e)}
+            reports.append(report)
+
+            if report['status'] == 'success':
+                speed = report['audio_seconds'] / report['seconds'] if report['seconds'] > 0 else 0.0
+                print(f"[{done}/{len(todo)}] {report['path']}: {report['audio_seconds']:.0f}s audio "
+                      f"in {report['seconds']:.1f}s ({speed:.1f}x realtime)")
+            else:
+                print(f"[{done}/{len(todo)}] {report['path']}: FAILED - {report.get('error')}")
+
+    wall = time.perf_counter() - wall_start
+    succeeded = [r for r in reports if r['status'] == 'success']
+    audio_total = sum(r['audio_seconds'] for r in succeeded)
+    summary = {
+        'files': len(reports),
+        'succeeded': len(succeeded),
+        'failed': len(reports) - len(succeeded),
+        'audio_seconds': audio_total,
+        'wall_seconds': wall,
+        'realtime_factor': audio_total / wall if wall > 0 else 0.0,
+        'files_per_hour': len(succeeded) / wall * 3600 if wall > 0 else 0.0,
+        'files_detail': reports
+    }
+    _write_atomic(os.path.join(args.output_dir, 'run_report.json'), json.dumps(summary, indent=2))
+
+    print(f"\nDone: {summary['succeeded']}/{summary['files']} succeeded, "
+          f"{audio_total / 60:.1f} min of audio in {wall / 60:.1f} min "
+          f"({summary['realtime_factor']:.1f}x realtime, {summary['files_per_hour']:.1f} files/hour)")
+    return 0 if not summary['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+# Audio Streaming
+# Reads audio from disk or an in-memory buffer in fixed-size windows
+# resampled to 16kHz mono, so memory stays flat regardless of lecture length,
+# using the fastest decoder available for the format
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+import audioread
+import numpy as np
+import soundfile as sf
+import soxr
+
+from instrumentation import NULL_PROFILER
+
+TARGET_SR = 16000
+
+# Decoders tried in order until one opens the input, fastest first per
+# format (see benchmarks/bench_decode.py); other extensions use 'default'
+DECODER_ORDER = {
+    'default': ('soundfile', 'ffmpeg', 'audioread'),
+    '.m4a': ('ffmpeg', 'audioread'),
+    '.mp4': ('ffmpeg', 'audioread'),
+    '.aac': ('ffmpeg', 'audioread'),
+    '.webm': ('ffmpeg', 'audioread'),
+}
+
+# libsndfile formats where ffmpeg's built-in resampler beats libsndfile +
+# soxr, so ffmpeg goes first for files on disk unless they are already at the
+# target rate (libsndfile's MP3 decoder is fast enough to win either way).
+# In-memory uploads stay on libsndfile: ffmpeg would need them spooled to disk
+FFMPEG_WHEN_RESAMPLING = ('.wav', '.flac', '.ogg', '.oga', '.aif', '.aiff')
+
+
+class DecodeError(RuntimeError):
+    """A decoder could not open or read the input"""
+
+
+def ffmpeg_binary():
+    """ffmpeg executable (LECTURE_AI_FFMPEG or PATH), or None when not installed"""
+    return os.environ.get("LECTURE_AI_FFMPEG") or shutil.which("ffmpeg")
+
+
+def as_audio_file(audio):
+    """
+    Normalize an audio source for the decoders
+    Paths and file-like objects (e.g. a Streamlit upload) pass through;
+    bytes are wrapped in a BytesIO, which shares the buffer instead of copying
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        return audio
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return io.BytesIO(audio)
+    return audio
+
+
+def _is_path(audio):
+    return isinstance(audio, (str, os.PathLike))
+
+
+def iter_audio_windows(audio, window_s=300, sr=TARGET_SR, profiler=NULL_PROFILER, start_s=0.0, decoder=None,
+                       overlap_s=0.0):
+    """
+    Stream audio as consecutive mono windows
+    Args:
+        audio: Path to audio file (.mp3, .wav, etc.), bytes, or a binary file-like object
+        window_s: Window length in seconds (None reads the whole file at once)
+        sr: Output sample rate
+        profiler: Records 'decode' and 'resample' time
+        start_s: Skip this much audio first (seeks where the decoder can)
+        decoder: Decoder tried first ('soundfile', 'ffmpeg', 'audioread');
+            None picks by file extension (LECTURE_AI_DECODER overrides)
+        overlap_s: Extra audio each window carries past its end, repeated at
+            the start of the next window, so a word on the edge is heard
+            whole by one of them; windows still start every window_s
+    Yields:
+        (start_seconds, samples) with samples as float32 at `sr`, timed
+        from the beginning of the recording
+    """
+    audio = as_audio_file(audio)
+    start_pos = None if _is_path(audio) else audio.tell()
+    errors = []
+    for name in decoder_order(audio, decoder, sr):
+        if start_pos is not None:
+            audio.seek(start_pos)
+        source = DECODERS[name](audio, sr, start_s)
+        try:
+            native_sr = next(source)
+            break
+        except (RuntimeError, EOFError, OSError, audioread.DecodeError) as e:
+            errors.append(f"{name}: {e}")
+    else:
+        raise DecodeError("no decoder could read the audio (" + "; ".join(errors) + ")")
+
+    window_len = None if window_s is None else int(window_s * sr)
+    blocks = _resample_stream(profiler.timed(source, 'decode'), native_sr, sr, profiler)
+    yield from _rewindow(blocks, window_len, sr, start=int(round(start_s * sr)), overlap_len=int(overlap_s * sr))
+
+
+def audio_duration(audio):
+    """Length in seconds from the header, or None if it can't be read"""
+    audio = as_audio_file(audio)
+    start_pos = None if _is_path(audio) else audio.tell()
+    try:
+        return sf.info(audio).duration
+    except RuntimeError:
+        pass
+    finally:
+        if start_pos is not None:
+            audio.seek(start_pos)
+    try:
+        with as_audio_path(audio) as path, audioread.audio_open(path) as f:
+            return f.duration
+    except Exception:
+        return None
+    finally:
+        if start_pos is not None:
+            audio.seek(start_pos)
+
+
+@contextmanager
+def as_audio_path(audio):
+    """
+    Path for consumers that can only open files (audioread, shard workers)
+    Bytes and buffers are spooled to a private temp file, removed afterwards
+    """
+    audio = as_audio_file(audio)
+    if _is_path(audio):
+        yield audio
+        return
+
+    suffix = os.path.splitext(getattr(audio, 'name', '') or '')[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(audio, tmp)
+    try:
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
+
+
+def _iter_soundfile_blocks(audio, block_s=10, start_s=0.0):
+    """Yield native sample rate first, then mono float32 blocks via libsndfile"""
+    with sf.SoundFile(audio) as f:
+        yield f.samplerate
+        if start_s:
+            f.seek(min(int(round(start_s * f.samplerate)), f.frames))
+        blocksize = int(block_s * f.samplerate)
+        for block in f.blocks(blocksize=blocksize, dtype='float32', always_2d=True):
+            yield block.mean(axis=1)
+
+
+def _iter_audioread_blocks(audio):
+    """Yield native sample rate first, then mono float32 blocks via audioread"""
+    with as_audio_path(audio) as path, audioread.audio_open(path) as f:
+        yield f.samplerate
+        channels = f.channels
+        for buf in f:
+            block = np.frombuffer(buf, dtype='<i2').astype(np.float32) / 32768.0
+            if channels > 1:
+                block = block.reshape(-1, channels).mean(axis=1)
+            yield block
+
+
+def _iter_ffmpeg_blocks(audio, sr=TARGET_SR, start_s=0.0, block_s=10):
+    """
+    Yield `sr` first, then mono float32 blocks from an ffmpeg subprocess
+    ffmpeg seeks, downmixes and resamples itself, so the output needs no
+    further resampling. Buffers are spooled to a file first: containers
+    such as m4a can't be decoded (or seeked) from a pipe.
+    """
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise DecodeError("ffmpeg not found")
+
+    with as_audio_path(audio) as path:
+        cmd = [binary, '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if start_s:
+            cmd += ['-ss', f'{start_s:.3f}']
+        # rematrix_maxval=1 averages channels like the other decoders
+        # (ffmpeg's default stereo downmix is 3dB louder)
+        cmd += ['-i', os.fspath(path), '-vn', '-af', 'aresample=rematrix_maxval=1',
+                '-ac', '1', '-ar', str(sr), '-f', 'f32le', 'pipe:1']
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        block_bytes = int(block_s * sr) * 4
+        try:
+            # Read ahead one block so a failed decode raises before any output
+            data = proc.stdout.read(block_bytes)
+            if not data and proc.wait() != 0:
+                raise DecodeError(proc.stderr.read().decode('utf-8', 'replace').strip() or "ffmpeg failed")
+            yield sr
+            while data:
+                usable = len(data) // 4 * 4
+                if usable:
+                    yield np.frombuffer(data[:usable], dtype='<f4')
+                data = proc.stdout.read(block_bytes)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.stderr.close()
+            proc.wait()
+
+
+def _decode_soundfile(audio, sr, start_s):
+    return _iter_soundfile_blocks(audio, start_s=start_s)
+
+
+def _decode_audioread(audio, sr, start_s):
+    source = _iter_audioread_blocks(audio)
+    native_sr = next(source)
+    yield native_sr
+    if start_s:
+        source = _skip_samples(source, int(round(start_s * native_sr)))
+    yield from source
+
+
+# name -> decode(audio, sr, start_s): generator yielding the sample rate of
+# its blocks first, then mono float32 blocks starting at start_s
+DECODERS = {
+    'soundfile': _decode_soundfile,
+    'ffmpeg': _iter_ffmpeg_blocks,
+    'audioread': _decode_audioread,
+}
+
+
+def decoder_order(audio, decoder=None, sr=TARGET_SR):
+    """
+    Decoders to try for an input, preferred first
+    The extension comes from the path or the buffer's name (uploads have
+    one); an explicit or LECTURE_AI_DECODER choice goes to the front.
+    ffmpeg is only moved ahead of libsndfile for paths, never for buffers.
+    """
+    preferred = decoder or os.environ.get("LECTURE_AI_DECODER")
+    if preferred and preferred not in DECODERS:
+        raise ValueError(f"Unknown decoder {preferred!r}; choose from {', '.join(DECODERS)}")
+
+    name = os.fspath(audio) if _is_path(audio) else getattr(audio, 'name', '') or ''
+    ext = os.path.splitext(str(name))[1].lower()
+    order = list(DECODER_ORDER.get(ext, DECODER_ORDER['default']))
+    if preferred:
+        return [preferred] + [d for d in order if d != preferred]
+    if (_is_path(audio) and ext in FFMPEG_WHEN_RESAMPLING and ffmpeg_binary() is not None
+            and _native_rate(audio) != sr):
+        order.remove('ffmpeg')
+        order.insert(0, 'ffmpeg')
+    return order
+
+
+def _native_rate(audio):
+    """Sample rate from the header via libsndfile, or None"""
+    start_pos = None if _is_path(audio) else audio.tell()
+    try:
+        return sf.info(audio).samplerate
+    except RuntimeError:
+        return None
+    finally:
+        if start_pos is not None:
+            audio.seek(start_pos)
+
+
+def _skip_samples(blocks, count):
+    """Drop the first `count` samples of a block stream (for decoders that can't seek)"""
+    for block in blocks:
+        if count >= len(block):
+            count -= len(block)
+            continue
+        yield block[count:]
+        count = 0
+
+
+def _resample_stream(blocks, native_sr, sr, profiler=NULL_PROFILER):
+    """Resample a block stream without edge artifacts between blocks"""
+    if native_sr == sr:
+        yield from blocks
+        return
+
+    resampler = soxr.ResampleStream(native_sr, sr, 1, dtype='float32')
+    for block in blocks:
+        with profiler.stage('resample'):
+            out = resampler.resample_chunk(np.ascontiguousarray(block, dtype=np.float32))
+        if len(out):
+            yield out
+    with profiler.stage('resample'):
+        tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+    if len(tail):
+        yield tail
+
+
+def _rewindow(blocks, window_len, sr, start=0, overlap_len=0):
+    """
+    Regroup variable-size blocks into windows of `window_len` samples, the
+    first at sample `start`, each extended by `overlap_len` samples that the
+    next window starts with again
+    """
+    pending = []
+    pending_len = 0
+    # Samples at the head of `pending` already sent as the previous window's overlap
+    sent = 0
+
+    for block in blocks:
+        pending.append(block)
+        pending_len += len(block)
+
+        while window_len is not None and pending_len >= window_len + overlap_len:
+            buffer = np.concatenate(pending)
+            yield start / sr, buffer[:window_len + overlap_len]
+            start += window_len
+            rest = buffer[window_len:]
+            pending = [rest] if len(rest) else []
+            pending_len = len(rest)
+            sent = overlap_len
+
+    if pending_len > sent:
+        yield start / sr, np.concatenate(pending)
@@ -0,0 +1,206 @@
+# Micro-batching Scheduler
+# Collects model requests from concurrent sessions and jobs for a few
+# milliseconds and runs them as one padded batch, so many users share each
+# forward pass instead of each running at batch size 1
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Weight of the newest batch in the running cost fit
+COST_SMOOTHING = 0.2
+
+
+class _CostModel:
+    """
+    Batch run time as overhead + size * per_item, fitted by exponentially
+    weighted least squares over recent batches
+    """
+
+    def __init__(self):
+        self.sums = [0.0] * 5  # weight, n, t, n*n, n*t
+
+    def update(self, size, seconds):
+        decay = 1 - COST_SMOOTHING
+        new = (1.0, size, seconds, size * size, size * seconds)
+        self.sums = [decay * old + value for old, value in zip(self.sums, new)]
+
+    def estimate(self, size):
+        weight, n, t, nn, nt = self.sums
+        if weight == 0:
+            return 0.0
+        mean_n, mean_t = n / weight, t / weight
+        variance = nn / weight - mean_n * mean_n
+        if variance < 1e-9:
+            # One batch size seen so far: assume extra items are free until
+            # bigger batches show otherwise
+            return mean_t
+        per_item = max((nt / weight - mean_n * mean_t) / variance, 0.0)
+        return max(mean_t - per_item * mean_n, 0.0) + per_item * size
+
+
+class _Request:
+    __slots__ = ('group', 'item', 'futures', 'enqueued', 'deadline')
+
+    def __init__(self, group, item, enqueued, deadline):
+        self.group = group
+        self.item = item
+        self.futures = []
+        self.enqueued = enqueued
+        self.deadline = deadline
+
+
+class BatchScheduler:
+    def __init__(self, run_batch, max_batch_size=8, max_wait_s=0.02, max_latency_s=None, name="batch-scheduler"):
+        """
+        Shared queue that turns single requests into batches
+        Requests are grouped by a hashable key (e.g. model and generation
+        settings): only requests of the same group can share a batch.
+        Args:
+            run_batch: run_batch(group, items) -> list of results, one per item
+            max_batch_size: Most items per model call
+            max_wait_s: How long the oldest request waits for company
+            max_latency_s: Default per-request latency cap (None = no cap);
+                a batch is started early and kept small enough that, at the
+                measured batch cost, it finishes before its tightest
+                deadline (best effort: a busy model can't be preempted)
+            name: Dispatcher thread name
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max_wait_s
+        self.max_latency_s = max_latency_s
+        self.name = name
+        self._pending = deque()
+        self._by_item = {}
+        self._cond = threading.Condition()
+        self._costs = {}
+        self._thread = None
+        self._closed = False
+        self._stats = {'requests': 0, 'coalesced': 0, 'batches': 0, 'items': 0, 'queue_seconds': 0.0}
+
+    def submit(self, group, item, max_latency_s=None):
+        """
+        Queue one item
+        Identical items of the same group that are still queued share one
+        slot in the batch (and one result).
+        Returns:
+            Future: resolves to the item's result, or raises the batch's error
+        """
+        now = time.perf_counter()
+        cap = max_latency_s if max_latency_s is not None else self.max_latency_s
+        deadline = now + cap if cap is not None else None
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._stats['requests'] += 1
+            request = self._by_item.get((group, item))
+            if request is None:
+                request = self._by_item[(group, item)] = _Request(group, item, now, deadline)
+                self._pending.append(request)
+            else:
+                self._stats['coalesced'] += 1
+                if deadline is not None and (request.deadline is None or deadline < request.deadline):
+                    request.deadline = deadline
+            request.futures.append(future)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def map(self, group, items, max_latency_s=None):
+        """Submit several items and wait for all of their results, in order"""
+        futures = [self.submit(group, item, max_latency_s) for item in items]
+        return [future.result() for future in futures]
+
+    def _estimate(self, group, size):
+        cost = self._costs.get(group)
+        return cost.estimate(size) if cost is not None else 0.0
+
+    def _next_batch(self):
+        """
+        Block until a batch is due, then take it off the queue
+        The group of the oldest request goes next (FIFO across groups). Its
+        batch is dispatched when it is full, when the oldest request has
+        waited max_wait_s, or when waiting longer would miss a deadline.
+        """
+        with self._cond:
+            while True:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return None, []
+
+                oldest = self._pending[0]
+                group = oldest.group
+                members = [r for r in self._pending if r.group == group][:self.max_batch_size]
+                deadlines = [r.deadline for r in members if r.deadline is not None]
+                due = oldest.enqueued + self.max_wait_s
+                if deadlines:
+                    due = min(due, min(deadlines) - self._estimate(group, len(members)))
+                remaining = due - time.perf_counter()
+                if len(members) >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+            # Keep the batch small enough to finish before its tightest
+            # deadline; once that is out of reach anyway (overload), a full
+            # batch clears the backlog fastest
+            if deadlines:
+                budget = min(deadlines) - time.perf_counter()
+                if self._estimate(group, 1) <= budget:
+                    while len(members) > 1 and self._estimate(group, len(members)) > budget:
+                        members.pop()
+
+            now = time.perf_counter()
+            for request in members:
+                self._pending.remove(request)
+                del self._by_item[(request.group, request.item)]
+                self._stats['queue_seconds'] += (now - request.enqueued) * len(request.futures)
+            self._stats['batches'] += 1
+            self._stats['items'] += len(members)
+            return group, members
+
+    def _dispatch_loop(self):
+        while True:
+            group, batch = self._next_batch()
+            if not batch:
+                return
+            t0 = time.perf_counter()
+            try:
+                results = list(self.run_batch(group, [request.item for request in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: run_batch returned {len(results)} results for {len(batch)} items")
+            except BaseException as e:
+                for request in batch:
+                    for future in request.futures:
+                        future.set_exception(e)
+                continue
+            seconds = time.perf_counter() - t0
+            with self._cond:
+                self._costs.setdefault(group, _CostModel()).update(len(batch), seconds)
+            for request, result in zip(batch, results):
+                for future in request.futures:
+                    future.set_result(result)
+
+    def stats(self):
+        """Requests, batches, mean batch size and mean queueing delay so far"""
+        with self._cond:
+            stats = dict(self._stats, pending=len(self._pending))
+        stats['mean_batch_size'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        stats['mean_queue_seconds'] = (
+            stats['queue_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Run what is queued, then stop the dispatcher thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,77 @@
+# Transcription Checkpoints
+# Every finished audio window is committed to SQLite as soon as it is decoded,
+# so a run that dies partway through resumes from the last finished window
+
+import json
+import os
+import threading
+import time
+
+from disk_cache import ThreadConnections, default_cache_dir
+
+
+class CheckpointStore:
+    def __init__(self, path):
+        """
+        Per-window results of unfinished transcription runs
+        A run is identified by the same key as the transcript cache (audio
+        hash + model + settings), so only an identical run can resume it
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect = ThreadConnections(path)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS windows ("
+                "run_key TEXT NOT NULL, idx INTEGER NOT NULL, record TEXT NOT NULL, "
+                "created REAL NOT NULL, PRIMARY KEY (run_key, idx))"
+            )
+
+    def save(self, run_key, idx, record):
+        """Commit one finished window (JSON-serializable record)"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO windows (run_key, idx, record, created) VALUES (?, ?, ?, ?)",
+                (run_key, idx, json.dumps(record), time.time())
+            )
+
+    def load(self, run_key):
+        """Records of windows 0..n-1 finished so far (stops at the first gap)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT idx, record FROM windows WHERE run_key = ? ORDER BY idx", (run_key,)
+            ).fetchall()
+        records = []
+        for idx, record in rows:
+            if idx != len(records):
+                break
+            records.append(json.loads(record))
+        return records
+
+    def clear(self, run_key):
+        """Forget a run once its full transcript is stored elsewhere"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM windows WHERE run_key = ?", (run_key,))
+
+    def prune(self, max_age_s=7 * 24 * 3600):
+        """Drop checkpoints of runs abandoned for longer than max_age_s"""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM windows WHERE run_key IN "
+                "(SELECT run_key FROM windows GROUP BY run_key HAVING MAX(created) < ?)",
+                (time.time() - max_age_s,)
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def default_checkpoints():
+    """Process-wide checkpoint store under the cache dir (stale runs pruned on open)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(os.path.join(default_cache_dir(), "checkpoints.sqlite"))
+            _store.prune()
+        return _store
@@ -0,0 +1,266 @@
+# Disk Cache
+# Persistent content-addressed cache backed by SQLite
+# Safe across threads and across app worker processes, with size-based LRU eviction
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Cache location, override with LECTURE_AI_CACHE_DIR
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lecture_ai")
+
+
+def default_cache_dir():
+    """Directory holding all on-disk caches"""
+    return os.environ.get("LECTURE_AI_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def hash_file(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks so memory stays flat"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_source(source, block_size=1 << 20):
+    """
+    SHA-256 of a path, bytes-like object or binary file-like object
+    File-like objects are read in blocks and rewound to where they were
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return hash_file(source, block_size)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+
+    digest = hashlib.sha256()
+    start = source.tell()
+    for block in iter(lambda: source.read(block_size), b''):
+        digest.update(block)
+    source.seek(start)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """Stable key from JSON-serializable parts (dicts are key-sorted)"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, path, max_bytes):
+        """
+        SQLite key-value store of JSON values
+        Args:
+            path: Database file (parent directories are created)
+            max_bytes: Least recently used entries are evicted beyond this size
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._connect = ThreadConnections(path)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def get(self, key):
+        """Return the cached value, or None on a miss"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._bump(conn, 'misses')
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._bump(conn, 'hits')
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store a JSON-serializable value and evict down to the size budget"""
+        blob = json.dumps(value).encode('utf-8')
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            self._evict(conn)
+
+    def delete(self, key):
+        """Remove one entry"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def stats(self):
+        """Hit/miss counters (shared by all processes) and current size"""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'entries': entries,
+            'bytes': total
+        }
+
+    def _bump(self, conn, name):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def _evict(self, conn):
+        """Delete least recently used entries until under max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+
+class MemoryCache:
+    def __init__(self, max_entries):
+        """
+        In-process LRU with the same get/set/stats interface as DiskCache
+        Values are returned as stored, so callers must not mutate them
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+class TieredCache:
+    def __init__(self, memory, disk=None):
+        """
+        Memory cache in front of an optional DiskCache
+        Disk hits are copied into memory; writes go to both tiers
+        """
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self):
+        """Per-tier stats: {'memory': {...}, 'disk': {...} or None}"""
+        return {
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None
+        }
+
+
+class Transaction:
+    def __init__(self, conn):
+        """Wrap a connection so `with` runs the block in one write transaction"""
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def connect(path):
+    """
+    Open a WAL-mode SQLite database shared safely by threads and processes
+    Returns a Transaction: `with connect(path) as conn:` runs one write transaction
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return Transaction(conn)
+
+
+class ThreadConnections:
+    def __init__(self, path):
+        """
+        One connect(path) per thread, opened on first use; stores call it in
+        place of connect (`with self._connect() as conn:`) and SQLite locking
+        handles other processes
+        """
+        self.path = path
+        self._local = threading.local()
+
+    def __call__(self):
+        transaction = getattr(self._local, 'transaction', None)
+        if transaction is None:
+            transaction = self._local.transaction = connect(self.path)
+        return transaction
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(name, max_mb):
+    """Process-wide DiskCache stored as <cache dir>/<name>.sqlite"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            path = os.path.join(default_cache_dir(), name + ".sqlite")
+            cache = DiskCache(path, int(max_mb * 1024 * 1024))
+            _caches[name] = cache
+        return cache
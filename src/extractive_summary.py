@@ -0,0 +1,87 @@
+# Extractive Summary
+# TextRank-style sentence ranking over TF-IDF cosine similarity, a fast
+# alternative to BART that picks the lecture's own most central sentences
+
+import numpy as np
+
+from key_terms import TOKEN_PATTERN
+
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+
+
+def rank_sentences(sentences):
+    """
+    TextRank centrality of each sentence
+    The similarity graph S = X X^T (minus self-loops) is never materialized:
+    each power iteration multiplies through the sparse TF-IDF matrix X, so
+    cost grows with the number of words, not the number of sentence pairs
+    Returns:
+        float64 array of scores summing to 1
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0)
+    try:
+        X = TfidfVectorizer(stop_words='english', token_pattern=TOKEN_PATTERN).fit_transform(sentences)
+    except ValueError:
+        # Only stop words: no similarity to rank on
+        return np.full(n, 1.0 / n)
+    XT = X.T.tocsr()
+
+    # Rows are L2-normalized, so the diagonal of X X^T is 1 for non-empty sentences
+    self_sim = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+
+    def similarity_dot(v):
+        return X @ (XT @ v) - self_sim * v
+
+    degree = similarity_dot(np.ones(n))
+    inv_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 1e-12)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        spread = similarity_dot(scores * inv_degree)
+        # Mass of sentences with no neighbours is redistributed uniformly
+        dangling = scores[inv_degree == 0].sum()
+        updated = (1 - DAMPING) / n + DAMPING * (spread + dangling / n)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            scores = updated
+            break
+        scores = updated
+    return scores / scores.sum()
+
+
+def textrank_summary(sentences, max_words=200):
+    """
+    Summary made of the most central sentences, in lecture order
+    The lecture is split into consecutive sections and the best sentence of
+    each is kept, so the summary covers the whole lecture and not just the
+    part where the most frequent topic is discussed
+    Args:
+        sentences: Sentences of the lecture (e.g. structure_content()['sentences'])
+        max_words: Approximate length budget of the summary
+    Returns:
+        str: Summary text
+    """
+    sentences = [s.strip() for s in sentences if s and s.strip()]
+    if not sentences:
+        return ""
+
+    scores = rank_sentences(sentences)
+    lengths = np.fromiter((len(s.split()) for s in sentences), dtype=np.int64, count=len(sentences))
+    num_sections = int(np.clip(max_words // max(lengths.mean(), 1), 1, len(sentences)))
+
+    # Best sentence of each section
+    bounds = np.linspace(0, len(sentences), num_sections + 1).astype(np.int64)
+    picks = [start + int(np.argmax(scores[start:end])) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    # Drop the weakest picks until the budget holds (always keep one sentence)
+    by_score = sorted(picks, key=lambda i: -scores[i])
+    total = int(lengths[picks].sum())
+    while total > max_words and len(by_score) > 1:
+        total -= int(lengths[by_score.pop()])
+
+    return ' '.join(sentences[i] for i in sorted(by_score))
@@ -0,0 +1,135 @@
+# Inference Backends
+# How a model is executed on CPU: plain fp32 PyTorch, PyTorch with dynamically
+# int8-quantized linear layers, or an ONNX Runtime export of the same model
+# torch/transformers are imported when a model is loaded, not at import time
+
+import os
+import shutil
+import sys
+import tempfile
+
+from disk_cache import default_cache_dir
+
+BACKENDS = ('fp32', 'int8', 'onnx')
+
+# Written last into a finished ONNX export; directories without it are discarded
+ONNX_EXPORT_MARKER = "export_complete"
+
+# Backend used when a component doesn't pick one, override with LECTURE_AI_BACKEND
+DEFAULT_BACKEND = 'fp32'
+
+
+def default_backend():
+    """Backend for components created without an explicit one"""
+    return os.environ.get("LECTURE_AI_BACKEND", DEFAULT_BACKEND)
+
+
+def check_backend(backend, device="cpu"):
+    """Validate a backend name; the optimized backends are CPU-only"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend != 'fp32' and device != "cpu":
+        raise ValueError(f"The {backend} backend runs on CPU only (got device {device!r})")
+    return backend
+
+
+def quantize_pipeline(pipe):
+    """
+    Replace the model's nn.Linear layers with dynamically quantized int8 ones
+    Weights are stored as int8, activations are quantized on the fly, so
+    encoder/decoder matmuls get cheaper without any calibration data
+    """
+    import torch
+
+    pipe.model = torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+
+def quantized_bytes(model):
+    """Size of int8 weights, which live in packed params outside model.parameters()"""
+    torch = sys.modules.get('torch')
+    if torch is None:
+        return 0  # nothing can have been quantized yet
+    total = 0
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._weight_bias()
+            total += weight.numel() * weight.element_size()
+            if bias is not None:
+                total += bias.numel() * bias.element_size()
+    return total
+
+
+def onnx_export_dir(model_name):
+    """Where the ONNX export of a model is kept between runs"""
+    return os.path.join(default_cache_dir(), "onnx", model_name.replace('/', '--'))
+
+
+def _ort_model_class(task):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSpeechSeq2Seq
+    except ImportError as e:
+        raise ImportError(
+            "The onnx backend needs optimum with ONNX Runtime: pip install 'optimum[onnxruntime]'"
+        ) from e
+    if task == "automatic-speech-recognition":
+        return ORTModelForSpeechSeq2Seq
+    if task == "summarization":
+        return ORTModelForSeq2SeqLM
+    raise ValueError(f"No ONNX Runtime model class for task {task!r}")
+
+
+def load_onnx_pipeline(task, model_name):
+    """
+    Pipeline running an ONNX Runtime export of the model
+    The first load exports the PyTorch weights and saves them under the
+    cache dir; later loads (and other processes) reuse that export
+    """
+    from transformers import AutoFeatureExtractor, AutoTokenizer, pipeline
+
+    model_class = _ort_model_class(task)
+    export_dir = onnx_export_dir(model_name)
+    if os.path.exists(os.path.join(export_dir, ONNX_EXPORT_MARKER)):
+        model = model_class.from_pretrained(export_dir)
+    else:
+        model = model_class.from_pretrained(model_name, export=True)
+        _save_export(model, export_dir)
+
+    kwargs = {'tokenizer': AutoTokenizer.from_pretrained(model_name)}
+    if task == "automatic-speech-recognition":
+        kwargs['feature_extractor'] = AutoFeatureExtractor.from_pretrained(model_name)
+    return pipeline(task, model=model, **kwargs)
+
+
+def _save_export(model, export_dir):
+    """
+    Save an export so other processes only ever see a complete one
+    It is written to a private directory next to export_dir and renamed into
+    place; if another process got there first, its export is kept
+    """
+    parent = os.path.dirname(export_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(export_dir) + '.tmp-', dir=parent)
+    try:
+        model.save_pretrained(tmp_dir)
+        open(os.path.join(tmp_dir, ONNX_EXPORT_MARKER), 'w').close()
+        if os.path.isdir(export_dir) and not os.path.exists(os.path.join(export_dir, ONNX_EXPORT_MARKER)):
+            # Left half-written by a crash before exports were renamed into place
+            shutil.rmtree(export_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, export_dir)
+        except OSError:
+            pass  # a finished export from another process is already there
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def model_file_bytes(model):
+    """On-disk size of an exported model (ONNX Runtime keeps roughly that resident)"""
+    model_dir = getattr(model, 'model_save_dir', None)
+    if not model_dir or not os.path.isdir(model_dir):
+        return 0
+    return sum(
+        entry.stat().st_size for entry in os.scandir(model_dir)
+        if entry.is_file() and entry.name.endswith(('.onnx', '.onnx_data'))
+    )
@@ -0,0 +1,166 @@
+# Instrumentation
+# Wall time, CPU time and peak memory per pipeline stage
+# Disabled profilers are a shared no-op object, so the hot paths pay ~nothing
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage
+    resource = None
+
+logger = logging.getLogger("lecture_ai.profile")
+
+# ru_maxrss is in KiB on Linux and bytes on macOS
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def _peak_rss_mb():
+    """Process memory high-water mark in MB"""
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT / (1024 * 1024)
+
+
+def profiling_enabled():
+    """Default for components created without an explicit profile flag"""
+    return os.environ.get("LECTURE_AI_PROFILE", "0") == "1"
+
+
+def log_enabled():
+    """Export finished profiles as JSON log lines"""
+    return os.environ.get("LECTURE_AI_PROFILE_LOG", "0") == "1"
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'wall', 'cpu', 'rss')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack().append(self.name)
+        self.rss = _peak_rss_mb()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        rss = _peak_rss_mb()
+        stack = self.profiler._stack()
+        name = '/'.join(stack)
+        stack.pop()
+        self.profiler.add(name, wall, cpu, rss, rss - self.rss)
+        return False
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, component, log=None):
+        """
+        Collects timings for one run of a component
+        Stages nest ('summary/generate'); a stage entered repeatedly (e.g.
+        once per audio window) is accumulated into a single record.
+        CPU time is process-wide, so it includes model worker threads.
+        Stages may run on several threads at once; each thread nests its own.
+        Args:
+            component: Name used in exported logs ('stt', 'text', 'llm')
+            log: Emit the report as a JSON log line on finish (default: env)
+        """
+        self.component = component
+        self.log = log_enabled() if log is None else log
+        self.records = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        """Open stage names of the calling thread"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage(self, name):
+        """Context manager timing one (sub-)stage"""
+        return _Stage(self, name)
+
+    def add(self, name, wall, cpu=0.0, peak_rss_mb=None, rss_growth_mb=0.0):
+        """Accumulate a measurement (also used for timings taken elsewhere)"""
+        with self._lock:
+            record = self.records.get(name)
+            if record is None:
+                record = self.records[name] = {
+                    'stage': name, 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                    'peak_rss_mb': 0.0, 'rss_growth_mb': 0.0
+                }
+            record['calls'] += 1
+            record['wall_s'] += wall
+            record['cpu_s'] += cpu
+            if peak_rss_mb is not None:
+                record['peak_rss_mb'] = max(record['peak_rss_mb'], peak_rss_mb)
+            record['rss_growth_mb'] += rss_growth_mb
+
+    def timed(self, iterable, name):
+        """Wrap an iterator so the time spent producing each item is recorded"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self):
+        """Records in first-seen order; also logged if enabled"""
+        with self._lock:
+            records = [dict(record) for record in self.records.values()]
+        if self.log:
+            logger.info(json.dumps({'component': self.component, 'stages': records}))
+        return records
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _NullProfiler:
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add(self, *args, **kwargs):
+        pass
+
+    def timed(self, iterable, name):
+        return iterable
+
+    def report(self):
+        return []
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def make_profiler(component, enabled=None):
+    """A fresh Profiler, or the shared no-op one when profiling is off"""
+    if enabled is None:
+        enabled = profiling_enabled()
+    return Profiler(component) if enabled else NULL_PROFILER
@@ -0,0 +1,316 @@
+# Background Job Queue
+# Runs transcription -> structuring -> generation off the Streamlit script
+# thread. Jobs, progress and results live in SQLite so the UI only polls,
+# and a bounded worker pool makes upload bursts queue instead of piling up
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_stream import audio_duration
+from disk_cache import ThreadConnections, default_cache_dir
+
+# Concurrent jobs per process, override with LECTURE_AI_JOB_WORKERS
+DEFAULT_JOB_WORKERS = 1
+
+# Share of the progress bar given to each stage
+TRANSCRIBE_SHARE = 0.8
+STRUCTURE_SHARE = 0.05
+
+# Each process refreshes the heartbeat of the jobs it owns this often; a job
+# whose heartbeat is older than JOB_STALE_S (or whose owner process is gone)
+# is taken over by another process
+HEARTBEAT_S = 10.0
+JOB_STALE_S = 60.0
+
+
+class JobStore:
+    def __init__(self, path):
+        """SQLite table of jobs: status, stage, progress, options and result"""
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect = ThreadConnections(path)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, name TEXT, status TEXT NOT NULL, "
+                "stage TEXT, progress REAL NOT NULL DEFAULT 0, options TEXT, "
+                "audio_path TEXT, result TEXT, error TEXT, "
+                "created REAL NOT NULL, updated REAL NOT NULL, owner TEXT, heartbeat REAL)"
+            )
+            # Stores created before jobs had owners
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (('owner', 'TEXT'), ('heartbeat', 'REAL')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def create(self, job_id, name, options, audio_path, owner=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, name, status, stage, options, audio_path, created, updated, "
+                "owner, heartbeat) VALUES (?, ?, 'queued', 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, name, json.dumps(options), audio_path, now, now, owner, now)
+            )
+
+    def update(self, job_id, expect_owner=None, **fields):
+        """
+        Set columns of one job; 'result' is JSON-encoded
+        With expect_owner, only while that owner still holds the job
+        Returns:
+            bool: whether the job was updated
+        """
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        query = f"UPDATE jobs SET {columns} WHERE job_id = ?"
+        params = (*fields.values(), job_id)
+        if expect_owner is not None:
+            query += " AND owner = ?"
+            params += (expect_owner,)
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount > 0
+
+    def claim(self, job_id, owner):
+        """Move a queued job of this owner to running; False if it was taken over or already started"""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'transcribing', progress = 0, "
+                "updated = ?, heartbeat = ? WHERE job_id = ? AND status = 'queued' AND owner = ?",
+                (now, now, job_id, owner)
+            ).rowcount > 0
+
+    def adopt(self, job, owner):
+        """
+        Re-queue an unfinished job under a new owner, unless it changed since
+        it was read (another process adopted it first, or its owner is alive)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', progress = 0, owner = ?, "
+                "heartbeat = ?, updated = ? WHERE job_id = ? AND status IN ('queued', 'running') "
+                "AND owner IS ? AND heartbeat IS ?",
+                (owner, now, now, job['job_id'], job['owner'], job['heartbeat'])
+            ).rowcount > 0
+
+    def heartbeat(self, owner):
+        """Mark every unfinished job of this owner as still alive"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                (time.time(), owner)
+            )
+
+    def get(self, job_id, with_result=True):
+        """One job as a dict, or None"""
+        with self._connect() as conn:
+            conn.row_factory = _row_dict
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            conn.row_factory = None
+        if row is None:
+            return None
+        return _decode(row, with_result)
+
+    def list(self, statuses=None, limit=50):
+        """Most recent jobs first (results left out to keep polling cheap)"""
+        query = "SELECT * FROM jobs"
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+            params = tuple(statuses)
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._connect() as conn:
+            conn.row_factory = _row_dict
+            rows = conn.execute(query, params + (limit,)).fetchall()
+            conn.row_factory = None
+        return [_decode(row, with_result=False) for row in rows]
+
+
+def _row_dict(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def _pid_alive(pid):
+    """Whether a local process exists (assumed alive where it can't be checked)"""
+    if os.name != 'posix':
+        return True  # os.kill would terminate it on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _orphaned(job, now):
+    """An unfinished job whose owner died or stopped sending heartbeats"""
+    if not job['owner'] or job['heartbeat'] is None or now - job['heartbeat'] > JOB_STALE_S:
+        return True
+    host, pid, _ = job['owner'].rsplit(':', 2)
+    return host == socket.gethostname() and not _pid_alive(int(pid))
+
+
+def _decode(row, with_result):
+    row['options'] = json.loads(row['options'] or '{}')
+    if with_result and row.get('result'):
+        row['result'] = json.loads(row['result'])
+    else:
+        row.pop('result', None)
+    return row
+
+
+class JobQueue:
+    def __init__(self, store, work_dir, max_workers=None):
+        """
+        Background runner for full lecture jobs
+        Several processes can share one store: each job belongs to the
+        process that accepted it, which keeps its heartbeat fresh. Jobs of a
+        dead or silent owner are re-queued by whichever process notices first.
+        Args:
+            store: JobStore persisting job state
+            work_dir: Where uploaded audio waits until its job has run
+            max_workers: Jobs run at once; the rest wait in the queue
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get("LECTURE_AI_JOB_WORKERS", DEFAULT_JOB_WORKERS))
+        self.store = store
+        self.work_dir = work_dir
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        os.makedirs(work_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lecture-job")
+        self._recover()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="lecture-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def submit(self, audio_bytes, name, options=None):
+        """
+        Queue a lecture for processing
+        Args:
+            audio_bytes: Uploaded file content
+            name: Original file name (shown in the UI, extension picks the decoder)
+            options: {'vad': bool, 'summary_mode': 'abstractive' | 'fast'}
+        Returns:
+            str: job ID to poll with get()
+        """
+        job_id = uuid.uuid4().hex
+        ext = os.path.splitext(name)[1].lower()
+        audio_path = os.path.join(self.work_dir, job_id + ext)
+        with open(audio_path, 'wb') as f:
+            f.write(audio_bytes)
+
+        options = options or {}
+        self.store.create(job_id, name, options, audio_path, self.owner)
+        self._executor.submit(self._run, job_id, audio_path, options)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list(self, limit=50):
+        return self.store.list(limit=limit)
+
+    def _recover(self):
+        """Take over jobs whose owning process died or stopped sending heartbeats"""
+        now = time.time()
+        for job in self.store.list(statuses=('queued', 'running'), limit=1000):
+            if job['owner'] == self.owner or not _orphaned(job, now):
+                continue
+            if not self.store.adopt(job, self.owner):
+                continue  # another process took it first
+            audio_path = job['audio_path']
+            if audio_path and os.path.exists(audio_path):
+                self._executor.submit(self._run, job['job_id'], audio_path, job['options'])
+            else:
+                self.store.update(job['job_id'], status='failed', error="interrupted before completion")
+
+    def _heartbeat_loop(self):
+        """Keep this process's jobs alive and pick up jobs of processes that died"""
+        while True:
+            time.sleep(HEARTBEAT_S)
+            try:
+                self.store.heartbeat(self.owner)
+                self._recover()
+            except Exception:
+                pass  # e.g. the database is briefly locked; retry next beat
+
+    def _run(self, job_id, audio_path, options):
+        """Full pipeline for one job (runs on a worker thread)"""
+        # Imported here so submitting a job never waits on model imports
+        from checkpoints import default_checkpoints
+        from llm_formatter import LLMFormatter, default_summary_cache, default_summary_scheduler
+        from search_index import default_search_index, lecture_id_for
+        from stt_engine import SpeechToTextEngine, default_transcript_cache
+        from text_processor import TextProcessor
+
+        store = self.store
+        owner = self.owner
+        # Another process may have adopted the job since it was queued here
+        if not store.claim(job_id, owner):
+            return
+        owned = True
+        try:
+            stt = SpeechToTextEngine(
+                vad=options.get('vad', False),
+                cache=default_transcript_cache(),
+                checkpoints=default_checkpoints()
+            )
+            duration = audio_duration(audio_path)
+
+            transcript = {}
+            last_update = 0.0
+            for segment in stt.transcribe_stream(audio_path, result=transcript):
+                # Throttle progress writes to one per second
+                now = time.monotonic()
+                if duration and now - last_update > 1.0:
+                    last_update = now
+                    store.update(job_id, owner, progress=TRANSCRIBE_SHARE * min(segment['end'] / duration, 1.0))
+
+            store.update(job_id, owner, stage='structuring', progress=TRANSCRIBE_SHARE)
+            structured = TextProcessor().structure_content(transcript['text'])
+            default_search_index().add_lecture(
+                lecture_id_for(structured['cleaned']), store.get(job_id, with_result=False)['name'],
+                structured, transcript['segments'], transcript['duration']
+            )
+
+            store.update(job_id, owner, stage='generating', progress=TRANSCRIBE_SHARE + STRUCTURE_SHARE)
+            outputs = LLMFormatter(
+                cache=default_summary_cache(), scheduler=default_summary_scheduler()
+            ).format_all_outputs(
+                structured, summary_mode=options.get('summary_mode', 'abstractive')
+            ).as_dict()
+
+            owned = store.update(job_id, owner, status='done', stage='done', progress=1.0, result={
+                'transcript': transcript['text'],
+                'segments': transcript['segments'],
+                'duration': transcript['duration'],
+                'structured': structured.as_dict(),
+                'outputs': outputs
+            })
+        except Exception as e:
+            owned = store.update(job_id, owner, status='failed', error=str(e))
+        finally:
+            # A job taken over meanwhile still needs its audio
+            if owned and os.path.exists(audio_path):
+                os.remove(audio_path)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide queue; it outlives Streamlit reruns and closed tabs"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            root = os.path.join(default_cache_dir(), "jobs")
+            _queue = JobQueue(JobStore(os.path.join(root, "jobs.sqlite")), root)
+        return _queue
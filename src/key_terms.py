@@ -0,0 +1,169 @@
+# Key Term Extraction
+# Frequency-ranked n-gram key terms using scikit-learn sparse counts, weighted
+# by IDF statistics accumulated across every lecture processed so far
+
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from disk_cache import ThreadConnections, default_cache_dir
+
+# Words of 2+ letters (digits/hyphens allowed after the first letter)
+TOKEN_PATTERN = r"(?u)\b[A-Za-z][A-Za-z0-9\-]+\b"
+
+# Persisted vocabulary cap: past it the rarest terms are dropped, so the
+# statistics file stops growing (a dropped term just counts as unseen)
+MAX_TERMS = 200000
+
+# Terms per SQLite IN (...) lookup, under the default host-parameter limit
+_QUERY_BATCH = 500
+
+
+class KeyTermIndex:
+    def __init__(self, ngram_range=(1, 3), min_count=2, stats_path=None, max_terms=MAX_TERMS):
+        """
+        Key-term extractor with reusable cross-lecture IDF statistics
+        Args:
+            ngram_range: Candidate phrase lengths in words
+            min_count: A candidate must appear in at least this many sentences
+            stats_path: SQLite file holding the document frequencies, shared
+                by every process using it; each lecture is counted in one
+                transaction (None keeps them in memory only)
+            max_terms: Most terms kept in the stats file
+        """
+        self.ngram_range = ngram_range
+        self.min_count = min_count
+        self.stats_path = stats_path
+        self.max_terms = max_terms
+
+        # In-memory statistics (stats_path=None)
+        self.num_docs = 0
+        self.doc_freq = {}
+        self.seen = set()
+        self._lock = threading.Lock()
+
+        self._connect = ThreadConnections(stats_path)
+        if stats_path:
+            os.makedirs(os.path.dirname(os.path.abspath(stats_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS documents (digest TEXT PRIMARY KEY)")
+                conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL)")
+
+    def _vectorizer(self, num_units):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        return CountVectorizer(
+            ngram_range=self.ngram_range,
+            stop_words='english',
+            token_pattern=TOKEN_PATTERN,
+            min_df=min(self.min_count, num_units),
+            dtype=np.int32
+        )
+
+    def idf(self, terms):
+        """Smoothed IDF of each term against all lectures seen so far"""
+        if self.stats_path:
+            found = {}
+            with self._connect() as conn:
+                n = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+                for i in range(0, len(terms), _QUERY_BATCH):
+                    batch = terms[i:i + _QUERY_BATCH]
+                    placeholders = ', '.join('?' for _ in batch)
+                    found.update(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", batch))
+            df = np.fromiter((found.get(t, 0) for t in terms), dtype=np.float64, count=len(terms))
+        else:
+            with self._lock:
+                df = np.fromiter((self.doc_freq.get(t, 0) for t in terms), dtype=np.float64, count=len(terms))
+                n = self.num_docs
+        return np.log((1.0 + n) / (1.0 + df)) + 1.0
+
+    def extract(self, units, top_k=20, update=True):
+        """
+        Rank key terms of one lecture
+        Args:
+            units: Sentences (or other text units) of the lecture
+            top_k: Number of terms returned
+            update: Add this lecture to the IDF statistics
+        Returns:
+            list: [(term, score)] best first
+        """
+        units = [u for u in units if u]
+        if not units:
+            return []
+
+        vectorizer = self._vectorizer(len(units))
+        try:
+            counts = vectorizer.fit_transform(units)
+        except ValueError:
+            # Nothing left after stop words / min count
+            return []
+        terms = vectorizer.get_feature_names_out().tolist()
+
+        # Sparse column sums: total occurrences and how many sentences use the term
+        tf = np.asarray(counts.sum(axis=0)).ravel()
+        spread = np.diff(counts.tocsc().indptr)
+        lengths = np.fromiter((t.count(' ') + 1 for t in terms), dtype=np.float64, count=len(terms))
+
+        # Longer phrases are rarer, so give them a boost over their parts
+        scores = np.log1p(tf) * np.log1p(spread) * self.idf(terms) * np.sqrt(lengths)
+
+        ranked = []
+        covered = []
+        for i in np.argsort(-scores, kind='stable'):
+            term = terms[i]
+            # Skip a term already covered by (or covering) a better phrase;
+            # padded so only whole words match ("net" is not in "network")
+            padded = f" {term} "
+            if any(padded in kept or kept in padded for kept in covered):
+                continue
+            covered.append(padded)
+            ranked.append((term, float(scores[i])))
+            if len(ranked) == top_k:
+                break
+
+        if update:
+            self.add_document(terms, units)
+        return ranked
+
+    def add_document(self, terms, units):
+        """Count one lecture towards document frequencies (once per distinct text)"""
+        digest = hashlib.sha1('\n'.join(units).encode('utf-8')).hexdigest()
+        if self.stats_path:
+            with self._connect() as conn:
+                if conn.execute("INSERT OR IGNORE INTO documents (digest) VALUES (?)", (digest,)).rowcount == 0:
+                    return
+                conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    ((term,) for term in terms)
+                )
+                excess = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0] - self.max_terms
+                if excess > 0:
+                    # Trim a tenth below the cap, so this runs once per many lectures
+                    conn.execute(
+                        "DELETE FROM terms WHERE term IN (SELECT term FROM terms ORDER BY df LIMIT ?)",
+                        (excess + self.max_terms // 10,)
+                    )
+            return
+        with self._lock:
+            if digest in self.seen:
+                return
+            self.seen.add(digest)
+            self.num_docs += 1
+            doc_freq = self.doc_freq
+            for term in terms:
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_key_term_index():
+    """Process-wide index persisted under the cache dir"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = KeyTermIndex(stats_path=os.path.join(default_cache_dir(), "key_terms_idf.sqlite"))
+        return _default_index
@@ -1,36 +1,273 @@
 # LLM-based Content Formatter
 # Generates flashcards, notes, and summaries using Hugging Face models
 
-from transformers import pipeline
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections.abc import Mapping
+from concurrent.futures import Future
+
+from batch_scheduler import BatchScheduler
+from disk_cache import MemoryCache, TieredCache, make_key, open_cache
+from extractive_summary import textrank_summary
+from inference_backends import check_backend, default_backend
+from instrumentation import NULL_PROFILER, make_profiler
+from model_registry import get_registry
+
+# BART's positional limit; longer inputs are chunked, never truncated
+MAX_INPUT_TOKENS = 1024
+# Per-chunk summary bounds for the map/reduce passes
+CHUNK_SUMMARY_MAX_LENGTH = 150
+CHUNK_SUMMARY_MIN_LENGTH = 30
+SUMMARY_BATCH_SIZE = 4
+# Content-defined chunk ends: a full chunk is cut after the sentence with the
+# lowest hash among those ending past CHUNK_MIN_FILL of the token budget. An
+# edit shifts that window by a few tokens but rarely changes which sentence
+# wins, so chunks after an edit keep their boundaries (and cached summaries)
+CHUNK_MIN_FILL = 0.9
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# 'abstractive' runs BART; 'fast' ranks and extracts the lecture's own sentences
+SUMMARY_MODES = ('abstractive', 'fast')
+
+# Chunk summaries kept in process memory, shared by every formatter
+SUMMARY_MEMORY_ENTRIES = 2048
+_summary_memory = MemoryCache(SUMMARY_MEMORY_ENTRIES)
+
+
+def default_summary_cache():
+    """
+    Shared summary cache: in-memory LRU backed by an on-disk cache sized by
+    LECTURE_AI_SUMMARY_CACHE_MB (0 keeps summaries in memory only)
+    """
+    disk_mb = float(os.environ.get("LECTURE_AI_SUMMARY_CACHE_MB", 256))
+    return TieredCache(_summary_memory, open_cache("summaries", disk_mb) if disk_mb > 0 else None)
+
+
+def _run_summary_batch(group, texts):
+    """Scheduler callback: one padded batch through the shared summarization pipeline"""
+    model_name, device, backend, generation_kwargs = group
+    pipe = get_registry().get_pipeline("summarization", model_name, device, backend)
+    outputs = pipe(list(texts), batch_size=len(texts), **dict(generation_kwargs))
+    return [out['summary_text'] for out in outputs]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def default_summary_scheduler():
+    """
+    Process-wide micro-batching scheduler for summarization, shared by app
+    sessions and background jobs. Sized by LECTURE_AI_SUMMARY_BATCH_SIZE,
+    LECTURE_AI_SUMMARY_BATCH_WAIT_MS and LECTURE_AI_SUMMARY_LATENCY_MS (0 = no cap)
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            latency_ms = float(os.environ.get("LECTURE_AI_SUMMARY_LATENCY_MS", 0))
+            _scheduler = BatchScheduler(
+                _run_summary_batch,
+                max_batch_size=int(os.environ.get("LECTURE_AI_SUMMARY_BATCH_SIZE", 8)),
+                max_wait_s=float(os.environ.get("LECTURE_AI_SUMMARY_BATCH_WAIT_MS", 20)) / 1000,
+                max_latency_s=latency_ms / 1000 if latency_ms > 0 else None,
+                name="summary-scheduler"
+            )
+        return _scheduler
+
 
 class LLMFormatter:
-    def __init__(self):
-        """Initialize LLM for content generation (optimized for speed)"""
+    def __init__(self, model_name="facebook/bart-large-cnn", profile=None, backend=None, cache=None,
+                 scheduler=None, max_latency_s=None):
+        """
+        Initialize LLM for content generation (optimized for speed)
+        profile: Record per-stage timings in results (None = LECTURE_AI_PROFILE)
+        backend: 'fp32', 'int8' (quantized linear layers) or 'onnx' (ONNX Runtime)
+            (None = LECTURE_AI_BACKEND)
+        cache: Cache of per-chunk summaries, e.g. default_summary_cache()
+            (None disables caching)
+        scheduler: BatchScheduler that batches chunks with other callers'
+            requests, e.g. default_summary_scheduler() (None runs them here)
+        max_latency_s: Latency cap for this formatter's scheduled requests
+            (None = the scheduler's default)
+        """
         # Use krega smaller, faster summarization model
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=-1)
+        self.model_name = model_name
+        self.device = "cpu"
+        self.backend = check_backend(backend or default_backend(), self.device)
+        self.cache = cache
+        self.scheduler = scheduler
+        self.max_latency_s = max_latency_s
+        self.profile = profile
+        
+        # Warm the shared registry so the first summary doesn't pay the load
+        self.summarizer
+    
+    @property
+    def summarizer(self):
+        """Summarization pipeline from the process-wide model registry"""
+        return get_registry().get_pipeline("summarization", self.model_name, self.device, self.backend)
+    
+    def _max_input_tokens(self):
+        """Longest input the summarizer accepts, leaving room for special tokens"""
+        tokenizer = self.summarizer.tokenizer
+        limit = min(tokenizer.model_max_length, MAX_INPUT_TOKENS)
+        return limit - tokenizer.num_special_tokens_to_add()
+    
+    def _chunk_by_tokens(self, text, max_tokens):
+        """
+        Pack whole sentences into chunks of at most max_tokens model tokens
+        All sentences are tokenized in one batched call to the fast tokenizer.
+        Chunks end at a content-defined sentence near the budget (see
+        CHUNK_MIN_FILL), so chunk boundaries survive edits elsewhere
+        """
+        tokenizer = self.summarizer.tokenizer
+        sentences = [s for s in SENTENCE_BOUNDARY.split(text.strip()) if s]
+        if not sentences:
+            return []
+        encoded = tokenizer(sentences, add_special_tokens=False, return_offsets_mapping=True)
+        if sum(len(ids) for ids in encoded['input_ids']) <= max_tokens:
+            # Fits in one input: no content-defined cut, or it would cost an extra reduce pass
+            return [' '.join(sentences)]
+        
+        min_tokens = int(max_tokens * CHUNK_MIN_FILL)
+        chunks = []
+        current = []
+        current_tokens = 0
+        
+        def cut():
+            """Emit current up to its lowest-hash sentence past min_tokens, keep the rest"""
+            nonlocal current, current_tokens
+            end, best, filled = len(current), None, 0
+            for i, (sentence, count) in enumerate(current):
+                filled += count
+                if filled >= min_tokens:
+                    rank = zlib.crc32(sentence.encode('utf-8'))
+                    if best is None or rank < best:
+                        end, best = i + 1, rank
+            chunks.append(' '.join(sentence for sentence, _ in current[:end]))
+            current = current[end:]
+            current_tokens = sum(count for _, count in current)
+        
+        for sentence, ids, offsets in zip(sentences, encoded['input_ids'], encoded['offset_mapping']):
+            if len(ids) > max_tokens:
+                # A single run-on sentence: cut it on token boundaries
+                if current:
+                    chunks.append(' '.join(sentence for sentence, _ in current))
+                    current, current_tokens = [], 0
+                for i in range(0, len(ids), max_tokens):
+                    piece = offsets[i:i + max_tokens]
+                    chunks.append(sentence[piece[0][0]:piece[-1][1]].strip())
+                continue
+            
+            while current_tokens + len(ids) > max_tokens:
+                cut()
+            current.append((sentence, len(ids)))
+            current_tokens += len(ids)
+        
+        if current:
+            chunks.append(' '.join(sentence for sentence, _ in current))
+        return chunks
+    
+    def summary_key(self, text, generation_kwargs):
+        """Cache key: chunk text plus everything that changes the generated summary"""
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return make_key('summary', text_hash, self.model_name, self.backend, generation_kwargs)
+    
+    def _summarize_batch(self, texts, max_length, min_length):
+        """
+        Summarize several chunks in padded batches
+        With a cache, only chunks never summarized with these settings reach
+        the model, so an edited lecture re-summarizes just its changed chunks
+        """
+        generation_kwargs = {
+            'max_length': max_length,
+            'min_length': min_length,
+            'do_sample': False,
+            'truncation': True
+        }
+        if self.cache is None:
+            return self._generate(texts, generation_kwargs)
+        
+        keys = [self.summary_key(text, generation_kwargs) for text in texts]
+        summaries = [self.cache.get(key) for key in keys]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if missing:
+            generated = self._generate([texts[i] for i in missing], generation_kwargs)
+            for i, summary in zip(missing, generated):
+                summaries[i] = summary
+                self.cache.set(keys[i], summary)
+        return summaries
     
-    def generate_summary(self, text, max_length=200, min_length=100):
+    def _generate(self, texts, generation_kwargs):
+        if self.scheduler is not None:
+            group = (self.model_name, self.device, self.backend, tuple(sorted(generation_kwargs.items())))
+            return self.scheduler.map(group, texts, self.max_latency_s)
+        outputs = self.summarizer(texts, batch_size=SUMMARY_BATCH_SIZE, **generation_kwargs)
+        return [out['summary_text'] for out in outputs]
+    
+    def generate_summary(self, text, max_length=200, min_length=100, profiler=NULL_PROFILER,
+                         mode='abstractive', sentences=None):
         """
-        Generate concise summary from text (optimized)
+        Generate concise summary covering the whole text (map-reduce)
+        Long text is split into token-bounded chunks that are summarized in
+        batches; the partial summaries are re-chunked and summarized again
+        until they fit in one model input. Cost grows linearly with length.
         Args:
             text: Input text
             max_length: Maximum length of summary
             min_length: Minimum length of summary
+            profiler: Records 'tokenize' and 'generate' time
+            mode: 'abstractive' (BART) or 'fast' (extractive, see generate_fast_summary)
+            sentences: Already segmented sentences of text, used by fast mode
         Returns:
             str: Summary text
         """
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode {mode!r}, expected one of {', '.join(SUMMARY_MODES)}")
+        if mode == 'fast':
+            with profiler.stage('rank'):
+                return self.generate_fast_summary(text, max_length, sentences)
+        
         try:
-            # Split text if too long
-            if len(text.split()) > 1024:
-                text = ' '.join(text.split()[:1024])
+            max_tokens = self._max_input_tokens()
+            with profiler.stage('tokenize'):
+                chunks = self._chunk_by_tokens(text, max_tokens)
             
-            summary = self.summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
-            return summary[0]['summary_text']
+            # Map / reduce passes until everything fits in a single input
+            while len(chunks) > 1:
+                with profiler.stage('generate'):
+                    partials = self._summarize_batch(
+                        chunks, CHUNK_SUMMARY_MAX_LENGTH, CHUNK_SUMMARY_MIN_LENGTH
+                    )
+                with profiler.stage('tokenize'):
+                    chunks = self._chunk_by_tokens(' '.join(partials), max_tokens)
+            
+            with profiler.stage('generate'):
+                summary = self._summarize_batch(chunks, max_length, min_length)
+            return summary[0]
         except Exception as e:
             
             sentences = text.split('.')[:3]
             return '. '.join(sentences) + '.'
     
+    def generate_fast_summary(self, text, max_length=200, sentences=None):
+        """
+        Extractive summary: TextRank over the lecture's sentences (no model call)
+        Args:
+            text: Input text, split on sentence punctuation if sentences is None
+            max_length: Approximate length budget in words
+            sentences: Sentences from TextProcessor, reused instead of re-splitting
+        Returns:
+            str: Summary text
+        """
+        if sentences is None:
+            sentences = SENTENCE_BOUNDARY.split(text.strip())
+        return textrank_summary(sentences, max_words=max_length)
+    
     def generate_flashcards(self, paragraphs, num_cards=15):
         """
         Generate detailed flashcards from content
@@ -86,15 +323,105 @@ class LLMFormatter:
         
         return ''.join(notes)
     
-    def format_all_outputs(self, structured_content):
+    def format_all_outputs(self, structured_content, prefetch=False, summary_mode='abstractive'):
         """
-        Generate all 3 output formats at once (fast)
+        Summary, flashcards and notes, each built the first time it is read
+        Args:
+            structured_content: Output of TextProcessor.structure_content
+            prefetch: Start every output now, with the BART summary on a
+                background thread so the cheap outputs don't wait behind it
+            summary_mode: 'abstractive' (BART) or 'fast' (extractive)
+        Returns:
+            LazyOutputs: read-only mapping with 'summary', 'flashcards',
+                'notes' and 'profile' keys
         """
-        full_text = structured_content['cleaned']
-        paragraphs = structured_content['paragraphs']
-        
-        return {
-            'summary': self.generate_summary(full_text),
-            'flashcards': self.generate_flashcards(paragraphs),
-            'notes': self.generate_structured_notes(structured_content)
-        }
+        if summary_mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode {summary_mode!r}, expected one of {', '.join(SUMMARY_MODES)}")
+        outputs = LazyOutputs(self, structured_content, make_profiler('llm', self.profile), summary_mode)
+        if prefetch:
+            outputs.prefetch()
+        return outputs
+
+
+class LazyOutputs(Mapping):
+    _KEYS = ('summary', 'flashcards', 'notes', 'profile')
+    
+    def __init__(self, formatter, structured_content, profiler=NULL_PROFILER, summary_mode='abstractive'):
+        """
+        Memoized outputs of one lecture; a value is computed on first access
+        Concurrent readers of the same output wait for a single computation
+        """
+        self.formatter = formatter
+        self.structured_content = structured_content
+        self.profiler = profiler
+        self.summary_mode = summary_mode
+        self._futures = {}
+        self._lock = threading.Lock()
+    
+    def _build(self, key):
+        content = self.structured_content
+        profiler = self.profiler
+        with profiler.stage(key):
+            if key == 'summary':
+                return self.formatter.generate_summary(
+                    content['cleaned'], profiler=profiler,
+                    mode=self.summary_mode, sentences=content['sentences']
+                )
+            if key == 'flashcards':
+                return self.formatter.generate_flashcards(content['paragraphs'])
+            return self.formatter.generate_structured_notes(content)
+    
+    def _run(self, key, future):
+        try:
+            future.set_result(self._build(key))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    def _future(self, key, background=False):
+        """The future holding `key`, starting its computation if nobody has"""
+        with self._lock:
+            future = self._futures.get(key)
+            started = future is not None
+            if not started:
+                future = self._futures[key] = Future()
+        if not started:
+            if background:
+                threading.Thread(
+                    target=self._run, args=(key, future), name=f"lecture-{key}", daemon=True
+                ).start()
+            else:
+                self._run(key, future)
+        return future
+    
+    def prefetch(self):
+        """Start the summary in the background, then build the cheap outputs here"""
+        self._future('summary', background=True)
+        self._future('flashcards')
+        self._future('notes')
+        return self
+    
+    def ready(self, key):
+        """True once `key` has been computed (reading it won't block)"""
+        with self._lock:
+            future = self._futures.get(key)
+        return key == 'profile' or (future is not None and future.done())
+    
+    def __getitem__(self, key):
+        if key == 'profile':
+            return self.profiler.report()
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return self._future(key).result()
+    
+    def __iter__(self):
+        return iter(self._KEYS)
+    
+    def __len__(self):
+        return len(self._KEYS)
+    
+    def as_dict(self):
+        """Plain dict with every output computed (e.g. for JSON export)"""
+        self.prefetch()
+        outputs = {key: self[key] for key in ('summary', 'flashcards', 'notes')}
+        outputs['profile'] = self['profile']
+        return outputs
@@ -0,0 +1,161 @@
+# Model Registry
+# Process-wide cache of loaded Hugging Face pipelines, shared by every
+# Streamlit session and rerun so each model is loaded from disk only once
+
+import os
+import threading
+from collections import OrderedDict
+
+from inference_backends import (
+    check_backend, load_onnx_pipeline, model_file_bytes, quantize_pipeline, quantized_bytes
+)
+
+# Memory budget for all cached models, override with LECTURE_AI_MODEL_MEMORY_MB
+DEFAULT_MEMORY_BUDGET_MB = 4096
+
+
+def _device_index(device):
+    """Map a device name to the index expected by transformers.pipeline"""
+    if device == "cuda":
+        return 0
+    if device.startswith("cuda:"):
+        return int(device.split(":", 1)[1])
+    return -1
+
+
+def _load_pipeline(task, model_name, device, backend="fp32"):
+    """Default loader: build a transformers pipeline for the given backend"""
+    check_backend(backend, device)
+    if backend == "onnx":
+        return load_onnx_pipeline(task, model_name)
+    from transformers import pipeline
+
+    pipe = pipeline(task, model=model_name, device=_device_index(device))
+    if backend == "int8":
+        quantize_pipeline(pipe)
+    return pipe
+
+
+def estimate_pipeline_bytes(pipe):
+    """
+    Estimate resident size of a pipeline from its model weights
+    Returns 0 when the object has no model attached
+    """
+    model = getattr(pipe, 'model', None)
+    if model is None:
+        return 0
+    if not hasattr(model, 'parameters'):
+        return model_file_bytes(model)
+
+    total = quantized_bytes(model)
+    for tensor in model.parameters():
+        total += tensor.numel() * tensor.element_size()
+    for tensor in model.buffers():
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=None, loader=None):
+        """
+        Thread-safe LRU cache of pipelines keyed by (task, model_name, device, backend)
+        Args:
+            memory_budget_mb: Total size allowed for cached models; least
+                recently used models are evicted beyond it
+            loader: Callable(task, model_name, device, backend) returning a pipeline
+        """
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.environ.get(
+                "LECTURE_AI_MODEL_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB
+            ))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.loader = loader or _load_pipeline
+
+        self._models = OrderedDict()  # key -> (pipe, size in bytes)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get_pipeline(self, task, model_name, device="cpu", backend="fp32"):
+        """
+        Return a warm pipeline, loading it on first use
+        Concurrent callers asking for the same model wait for a single load
+        backend: 'fp32', 'int8' or 'onnx' (see inference_backends)
+        """
+        key = (task, model_name, device, backend)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    return entry[0]
+
+            pipe = self.loader(task, model_name, device, backend)
+            self.register(task, model_name, device, pipe, backend)
+
+        with self._lock:
+            self._load_locks.pop(key, None)
+        return pipe
+
+    def register(self, task, model_name, device, pipe, backend="fp32"):
+        """Insert an already built pipeline (e.g. a preloaded or stand-in model)"""
+        key = (task, model_name, device, backend)
+        size = estimate_pipeline_bytes(pipe)
+
+        with self._lock:
+            self._models[key] = (pipe, size)
+            self._models.move_to_end(key)
+            self._evict_over_budget(keep=key)
+
+    def evict(self, task, model_name, device="cpu", backend="fp32"):
+        """Drop one model from the cache, returns True if it was cached"""
+        with self._lock:
+            return self._models.pop((task, model_name, device, backend), None) is not None
+
+    def clear(self):
+        """Drop every cached model"""
+        with self._lock:
+            self._models.clear()
+
+    def memory_used(self):
+        """Estimated bytes held by cached models"""
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def loaded_models(self):
+        """Cached keys, least recently used first"""
+        with self._lock:
+            return list(self._models.keys())
+
+    def _evict_over_budget(self, keep):
+        """Evict LRU models until under budget (caller holds the lock)"""
+        total = sum(size for _, size in self._models.values())
+        for key in list(self._models.keys()):
+            if total <= self.memory_budget:
+                break
+            if key == keep:
+                continue
+            _, size = self._models.pop(key)
+            total -= size
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,481 @@
+# Lecture Search Index
+# Persistent BM25 search over the paragraphs of every processed lecture.
+# Each batch of added lectures becomes an immutable segment of sparse postings
+# (CSC arrays, memory-mapped when opened); small segments are merged on a
+# background thread after later adds, so the index grows without full rebuilds
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from disk_cache import ThreadConnections, default_cache_dir
+from key_terms import TOKEN_PATTERN
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Segments are tiered by size (powers of MERGE_FACTOR docs); a tier holding
+# MERGE_FACTOR segments is merged into one segment of the next tier, so each
+# paragraph is rewritten only O(log n) times and the segment count stays small
+MERGE_FACTOR = 4
+
+SNIPPET_CHARS = 300
+
+# Times search re-reads the catalog when a listed segment was merged away
+# by another process before it could be opened
+OPEN_ATTEMPTS = 3
+
+
+def lecture_id_for(text):
+    """Content-derived lecture ID, so re-processing the same lecture replaces it"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def paragraph_times(paragraphs, segments):
+    """
+    (start, end) seconds of each paragraph, aligned to the transcript segments
+    by word position (cleaning keeps words in order, only spacing changes)
+    Returns:
+        float32 array of shape (n, 2), NaN where no timing is known
+    """
+    times = np.full((len(paragraphs), 2), np.nan, dtype=np.float32)
+    if not segments or not len(paragraphs):
+        return times
+
+    seg_words = np.fromiter((len(seg['text'].split()) for seg in segments), dtype=np.int64, count=len(segments))
+    seg_first_word = np.concatenate([[0], np.cumsum(seg_words)[:-1]])
+    seg_starts = np.array([seg['start'] for seg in segments], dtype=np.float64)
+    seg_ends = np.array([seg['end'] for seg in segments], dtype=np.float64)
+
+    para_words = np.fromiter((len(p.split()) for p in paragraphs), dtype=np.int64, count=len(paragraphs))
+    first_word = np.concatenate([[0], np.cumsum(para_words)[:-1]])
+    last_word = first_word + np.maximum(para_words - 1, 0)
+
+    first_seg = np.clip(np.searchsorted(seg_first_word, first_word, side='right') - 1, 0, len(segments) - 1)
+    last_seg = np.clip(np.searchsorted(seg_first_word, last_word, side='right') - 1, 0, len(segments) - 1)
+    times[:, 0] = seg_starts[first_seg]
+    times[:, 1] = seg_ends[last_seg]
+    return times
+
+
+def _build_analyzer():
+    """Tokenizer shared by indexing and queries (lowercased, stop words removed)"""
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    return CountVectorizer(stop_words='english', token_pattern=TOKEN_PATTERN).build_analyzer()
+
+
+class _Segment:
+    def __init__(self, path, mmap=True):
+        """Read-only view of one segment directory"""
+        mode = 'r' if mmap else None
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mode)
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.path = path
+        self.lecture_ids = meta['lecture_ids']
+        self.term_ids = {term: i for i, term in enumerate(meta['terms'])}
+        self.indptr = load('indptr')
+        self.indices = load('indices')
+        self.tf = load('tf')
+        self.doc_len = np.asarray(load('doc_len'), dtype=np.float32)
+        self.doc_lecture = load('doc_lecture')
+        self.doc_paragraph = load('doc_paragraph')
+        self.doc_times = load('doc_times')
+        self.doc_offsets = load('doc_offsets')
+        # Mapped now, so snippets still read after a merge deletes the directory
+        with open(os.path.join(path, 'texts.bin'), 'rb') as f:
+            if mmap and os.fstat(f.fileno()).st_size:
+                self._texts = np.memmap(f, dtype=np.uint8, mode='r')
+            else:
+                self._texts = f.read()
+
+    @property
+    def num_docs(self):
+        return len(self.doc_len)
+
+    def postings(self, term):
+        """(doc ids, term frequencies) of one term, empty if absent"""
+        i = self.term_ids.get(term)
+        if i is None:
+            return None
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.tf[start:end]
+
+    def text(self, doc):
+        start, end = self.doc_offsets[doc]
+        return bytes(self._texts[start:end]).decode('utf-8')
+
+    def documents(self, docs):
+        """Full records of some docs (used when merging)"""
+        texts = bytes(self._texts)
+        for doc in docs:
+            start, end = self.doc_offsets[doc]
+            yield {
+                'lecture_id': self.lecture_ids[self.doc_lecture[doc]],
+                'paragraph': int(self.doc_paragraph[doc]),
+                'start': float(self.doc_times[doc, 0]),
+                'end': float(self.doc_times[doc, 1]),
+                'text': texts[start:end].decode('utf-8')
+            }
+
+
+def _write_segment(path, docs, analyzer):
+    """Build and save one segment from paragraph records"""
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    lecture_ids = sorted({doc['lecture_id'] for doc in docs})
+    lecture_index = {lecture_id: i for i, lecture_id in enumerate(lecture_ids)}
+
+    vectorizer = CountVectorizer(analyzer=analyzer, dtype=np.int32)
+    try:
+        counts = vectorizer.fit_transform(doc['text'] for doc in docs)
+        terms = vectorizer.get_feature_names_out().tolist()
+    except ValueError:
+        # Nothing but stop words: searchable by no term, but still listed
+        counts = csr_matrix((len(docs), 0), dtype=np.int32)
+        terms = []
+    postings = counts.tocsc()
+    postings.sort_indices()
+
+    blobs = [doc['text'].encode('utf-8') for doc in docs]
+    lengths = np.array([len(blob) for blob in blobs], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    offsets = np.stack([ends - lengths, ends], axis=1)
+
+    os.makedirs(path)
+    arrays = {
+        'indptr': postings.indptr.astype(np.int64),
+        'indices': postings.indices.astype(np.int32),
+        'tf': postings.data.astype(np.float32),
+        'doc_len': np.asarray(counts.sum(axis=1)).ravel().astype(np.float32),
+        'doc_lecture': np.array([lecture_index[doc['lecture_id']] for doc in docs], dtype=np.int32),
+        'doc_paragraph': np.array([doc['paragraph'] for doc in docs], dtype=np.int32),
+        'doc_times': np.array([[doc['start'], doc['end']] for doc in docs], dtype=np.float32).reshape(-1, 2),
+        'doc_offsets': offsets
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+    with open(os.path.join(path, 'texts.bin'), 'wb') as f:
+        for blob in blobs:
+            f.write(blob)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'lecture_ids': lecture_ids, 'terms': terms}, f)
+
+
+class SearchIndex:
+    def __init__(self, path, mmap=True):
+        """
+        Paragraph-level search index across lectures
+        Args:
+            path: Directory holding index.sqlite (catalog) and segment folders
+            mmap: Memory-map segment arrays instead of reading them into RAM
+        """
+        self.path = path
+        self.mmap = mmap
+        self._tokenize = None
+        self._segments = {}  # name -> _Segment, opened on first query
+        self._segments_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._merge_requested = False
+        self._merge_thread = None
+        self._connect = ThreadConnections(os.path.join(path, 'index.sqlite'))
+        os.makedirs(os.path.join(path, 'segments'), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "name TEXT PRIMARY KEY, num_docs INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lectures ("
+                "lecture_id TEXT PRIMARY KEY, title TEXT, segment TEXT NOT NULL, "
+                "num_paragraphs INTEGER NOT NULL, duration REAL, added REAL NOT NULL)"
+            )
+
+    @property
+    def _analyzer(self):
+        """Query/index tokenizer, built on first use (keeps sklearn out of startup)"""
+        if self._tokenize is None:
+            self._tokenize = _build_analyzer()
+        return self._tokenize
+
+    def _segment_dir(self, name):
+        return os.path.join(self.path, 'segments', name)
+
+    def add_lecture(self, lecture_id, title, structured, segments=None, duration=None):
+        """
+        Index one lecture (replacing an earlier version with the same ID)
+        Args:
+            lecture_id: Stable ID, e.g. lecture_id_for(cleaned text)
+            title: Shown in results (e.g. the file name)
+            structured: structure_content() output (or its as_dict())
+            segments: Transcript segments, used to timestamp paragraphs
+            duration: Recording length in seconds
+        Returns:
+            int: paragraphs indexed
+        """
+        paragraphs = list(structured['paragraphs'])
+        times = paragraph_times(paragraphs, segments)
+        docs = [
+            {'lecture_id': lecture_id, 'paragraph': i, 'start': float(times[i, 0]),
+             'end': float(times[i, 1]), 'text': text}
+            for i, text in enumerate(paragraphs) if text.strip()
+        ]
+        if not docs:
+            return 0
+
+        name = f"{time.time():.6f}-{uuid.uuid4().hex[:8]}"
+        _write_segment(self._segment_dir(name), docs, self._analyzer)
+        with self._connect() as conn:
+            conn.execute("INSERT INTO segments (name, num_docs, created) VALUES (?, ?, ?)",
+                         (name, len(docs), time.time()))
+            conn.execute(
+                "INSERT OR REPLACE INTO lectures (lecture_id, title, segment, num_paragraphs, duration, added) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (lecture_id, title, name, len(docs), duration, time.time())
+            )
+        self._request_merge()
+        return len(docs)
+
+    def remove_lecture(self, lecture_id):
+        """Drop a lecture from results (its postings go away at the next merge)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM lectures WHERE lecture_id = ?", (lecture_id,))
+
+    def lectures(self):
+        """Indexed lectures, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT lecture_id, title, num_paragraphs, duration, added FROM lectures ORDER BY added DESC"
+            ).fetchall()
+        return [dict(zip(('lecture_id', 'title', 'num_paragraphs', 'duration', 'added'), row)) for row in rows]
+
+    def _catalog(self):
+        """Current segment names and {lecture_id: (title, live segment)}"""
+        with self._connect() as conn:
+            segments = [row[0] for row in conn.execute("SELECT name FROM segments ORDER BY created")]
+            lectures = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT lecture_id, title, segment FROM lectures")}
+        return segments, lectures
+
+    def _open(self, name):
+        with self._segments_lock:
+            segment = self._segments.get(name)
+            if segment is None:
+                segment = self._segments[name] = _Segment(self._segment_dir(name), self.mmap)
+            return segment
+
+    def _open_catalog(self):
+        """
+        Catalog with every listed segment opened
+        A merge in another process can delete a segment between reading the
+        catalog and opening it; the catalog is read again then. Segments
+        already opened stay readable after deletion (their files are mapped).
+        Returns:
+            ([(name, _Segment)], {lecture_id: (title, live segment)})
+        """
+        for attempt in range(OPEN_ATTEMPTS):
+            names, lectures = self._catalog()
+            with self._segments_lock:
+                # Forget segments that were merged away
+                for name in set(self._segments) - set(names):
+                    del self._segments[name]
+            try:
+                return [(name, self._open(name)) for name in names], lectures
+            except FileNotFoundError:
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+
+    def _live_mask(self, name, segment, lectures):
+        """Docs of lectures whose current version lives in this segment"""
+        live_lectures = np.array([lectures.get(lid, (None, None))[1] == name for lid in segment.lecture_ids])
+        return live_lectures[segment.doc_lecture]
+
+    def search(self, query, top_k=10):
+        """
+        Ranked paragraphs matching a query (BM25 over all lectures)
+        Returns:
+            list: [{'lecture_id', 'title', 'paragraph', 'start', 'end', 'score', 'text'}]
+                best first; start/end are seconds into the recording (None if unknown)
+        """
+        terms = list(dict.fromkeys(self._analyzer(query)))
+        if not terms:
+            return []
+        opened, lectures = self._open_catalog()
+        segments = [(name, seg, self._live_mask(name, seg, lectures)) for name, seg in opened]
+
+        # Corpus statistics over live docs of every segment
+        total_docs = sum(int(live.sum()) for _, _, live in segments)
+        if total_docs == 0:
+            return []
+        avg_len = sum(float(seg.doc_len[live].sum()) for _, seg, live in segments) / total_docs
+        doc_freq = {term: 0 for term in terms}
+        for _, seg, live in segments:
+            for term in terms:
+                hit = seg.postings(term)
+                if hit is not None:
+                    doc_freq[term] += int(live[hit[0]].sum())
+        idf = {term: np.log1p((total_docs - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+        candidates = []
+        for name, seg, live in segments:
+            scores = None
+            for term in terms:
+                hit = seg.postings(term)
+                if hit is None:
+                    continue
+                docs, tf = hit
+                if scores is None:
+                    scores = np.zeros(seg.num_docs, dtype=np.float32)
+                norm = K1 * (1 - B + B * seg.doc_len[docs] / avg_len)
+                scores[docs] += idf[term] * tf * (K1 + 1) / (tf + norm)
+            if scores is None:
+                continue
+            scores[~live] = 0
+            k = min(top_k, int(np.count_nonzero(scores)))
+            if k == 0:
+                continue
+            best = np.argpartition(-scores, k - 1)[:k]
+            candidates.extend((float(scores[doc]), name, int(doc)) for doc in best)
+
+        candidates.sort(key=lambda c: -c[0])
+        results = []
+        opened = dict(opened)
+        for score, name, doc in candidates[:top_k]:
+            seg = opened[name]
+            lecture_id = seg.lecture_ids[seg.doc_lecture[doc]]
+            start, end = (float(t) for t in seg.doc_times[doc])
+            results.append({
+                'lecture_id': lecture_id,
+                'title': lectures[lecture_id][0],
+                'paragraph': int(seg.doc_paragraph[doc]),
+                'start': None if np.isnan(start) else start,
+                'end': None if np.isnan(end) else end,
+                'score': score,
+                'text': seg.text(doc)[:SNIPPET_CHARS]
+            })
+        return results
+
+    def _request_merge(self):
+        """
+        Run tier merges on a background thread, so adding a lecture (e.g. from
+        a button click) never waits for a cascade of merges
+        """
+        with self._merge_lock:
+            self._merge_requested = True
+            if self._merge_thread is None:
+                # Not a daemon: a process that exits mid-merge waits for it
+                self._merge_thread = threading.Thread(target=self._merge_loop, name="search-index-merge")
+                self._merge_thread.start()
+
+    def _merge_loop(self):
+        while True:
+            with self._merge_lock:
+                if not self._merge_requested:
+                    self._merge_thread = None
+                    return
+                self._merge_requested = False
+            try:
+                self._maybe_merge()
+            except Exception:
+                pass  # left unmerged; the next add tries again
+
+    def wait_for_merges(self):
+        """Block until background merges requested so far have finished"""
+        with self._merge_lock:
+            thread = self._merge_thread
+        if thread is not None:
+            thread.join()
+
+    def _maybe_merge(self):
+        """Merge full size tiers, smallest first, until none is full"""
+        if not self._write_lock.acquire(blocking=False):
+            return  # another thread is already merging
+        try:
+            while True:
+                with self._connect() as conn:
+                    rows = conn.execute("SELECT name, num_docs FROM segments ORDER BY created").fetchall()
+                tiers = {}
+                for name, num_docs in rows:
+                    tiers.setdefault(int(math.log(max(num_docs, 1), MERGE_FACTOR)), []).append(name)
+                full = [names for _, names in sorted(tiers.items()) if len(names) >= MERGE_FACTOR]
+                if not full:
+                    return
+                self._merge(full[0][:MERGE_FACTOR])
+        finally:
+            self._write_lock.release()
+
+    def _merge(self, names):
+        """Replace some segments with one holding only their live docs"""
+        _, lectures = self._catalog()
+        docs = []
+        try:
+            for name in names:
+                seg = _Segment(self._segment_dir(name), mmap=True)
+                live = np.flatnonzero(self._live_mask(name, seg, lectures))
+                docs.extend(seg.documents(live))
+        except FileNotFoundError:
+            return  # another process merged these first
+
+        merged = f"{time.time():.6f}-{uuid.uuid4().hex[:8]}"
+        if docs:
+            _write_segment(self._segment_dir(merged), docs, self._analyzer)
+        moved = {doc['lecture_id'] for doc in docs}
+
+        placeholders = ', '.join('?' for _ in names)
+        with self._connect() as conn:
+            present = conn.execute(
+                f"SELECT COUNT(*) FROM segments WHERE name IN ({placeholders})", tuple(names)
+            ).fetchone()[0]
+            if present < len(names):
+                # Another process merged some of these first
+                shutil.rmtree(self._segment_dir(merged), ignore_errors=True)
+                return
+            if docs:
+                conn.execute("INSERT INTO segments (name, num_docs, created) VALUES (?, ?, ?)",
+                             (merged, len(docs), time.time()))
+            # Lectures re-added while merging keep their newer segment
+            for lecture_id in moved:
+                conn.execute(
+                    f"UPDATE lectures SET segment = ? WHERE lecture_id = ? AND segment IN ({placeholders})",
+                    (merged, lecture_id, *names)
+                )
+            conn.execute(f"DELETE FROM segments WHERE name IN ({placeholders})", tuple(names))
+
+        with self._segments_lock:
+            for name in names:
+                self._segments.pop(name, None)
+        for name in names:
+            shutil.rmtree(self._segment_dir(name), ignore_errors=True)
+
+    def stats(self):
+        """Lecture, live paragraph and segment counts"""
+        with self._connect() as conn:
+            lectures, paragraphs = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(num_paragraphs), 0) FROM lectures"
+            ).fetchone()
+            segments = conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {'lectures': lectures, 'segments': segments, 'paragraphs': paragraphs}
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_search_index():
+    """Process-wide index persisted under the cache dir"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = SearchIndex(os.path.join(default_cache_dir(), "search"))
+        return _default_index
@@ -0,0 +1,174 @@
+# Sharded Transcription
+# Splits one recording into overlapping time shards for a process pool and
+# stitches the shard transcripts back together on the words both shards heard
+
+import difflib
+import math
+import os
+import re
+import time
+
+from audio_stream import TARGET_SR, iter_audio_windows
+
+# Audio both neighbours transcribe around each shard boundary
+DEFAULT_OVERLAP_S = 8.0
+# Fewest matching words accepted as an alignment of two overlaps
+MIN_MATCH_WORDS = 2
+
+_NORMALIZE = re.compile(r"[^\w']+")
+
+# Per-process engine, built once by the pool initializer
+_worker = {}
+
+
+def plan_shards(duration, num_shards, overlap_s=DEFAULT_OVERLAP_S, min_shard_s=60.0):
+    """
+    Cut [0, duration) into contiguous shards, each widened by overlap_s on
+    the sides it shares with a neighbour
+    Returns:
+        list: (start, end, boundary_before) per shard; boundary_before is
+            where the previous shard's share ends (None for the first)
+    """
+    num_shards = max(1, min(num_shards, int(duration // min_shard_s) or 1))
+    length = duration / num_shards
+    shards = []
+    for i in range(num_shards):
+        core_start = i * length
+        core_end = duration if i == num_shards - 1 else (i + 1) * length
+        start = max(0.0, core_start - overlap_s) if i else 0.0
+        end = min(duration, core_end + overlap_s) if i < num_shards - 1 else duration
+        shards.append((start, end, core_start if i else None))
+    return shards
+
+
+def _words(segments):
+    words = ' '.join(seg['text'] for seg in segments).split()
+    return words, [_NORMALIZE.sub('', w.lower()) for w in words]
+
+
+def stitch_segments(left, right, boundary, overlap_s=DEFAULT_OVERLAP_S):
+    """
+    Join the segments of two neighbouring shards
+    Both shards transcribed [boundary - overlap_s, boundary + overlap_s]. The
+    words from that zone are aligned (longest common run of words) and the
+    transcript switches from left to right in the middle of the match, so no
+    word is repeated or lost. Segments keep their own timestamps; only the
+    one the switch falls inside is trimmed. Without a usable match it falls
+    back to cutting both sides at the boundary time.
+    Returns:
+        list: merged segments in time order
+    """
+    zone_start, zone_end = boundary - overlap_s, boundary + overlap_s
+    left_keep = [seg for seg in left if seg['end'] <= zone_start]
+    left_zone = left[len(left_keep):]
+    right_zone = [seg for seg in right if seg['start'] < zone_end]
+    right_keep = right[len(right_zone):]
+
+    left_words, left_norm = _words(left_zone)
+    right_words, right_norm = _words(right_zone)
+    match = difflib.SequenceMatcher(None, left_norm, right_norm, autojunk=False).find_longest_match(
+        0, len(left_norm), 0, len(right_norm)
+    )
+    if match.size < MIN_MATCH_WORDS:
+        return (
+            left_keep + [seg for seg in left_zone if seg['start'] < boundary]
+            + [seg for seg in right_zone if seg['start'] >= boundary] + right_keep
+        )
+
+    half = match.size // 2
+    return left_keep + _trim(left_zone, 0, match.a + half) + _trim(right_zone, match.b + half) + right_keep
+
+
+def merge_window(held, start, segments, next_start, overlap_s):
+    """
+    Add one window of a stream of overlapping windows to the transcript
+    Args:
+        held: Segments of the previous window that reach into this one
+        start: Where this window starts
+        segments: This window's segments
+        next_start: Where the next window (and its overlap) starts
+        overlap_s: Audio consecutive windows share
+    Returns:
+        (ready, held): segments that are final, in time order, and the ones
+            reaching into the next window, to pass to the next call
+    """
+    if held:
+        segments = stitch_segments(held, segments, start + overlap_s / 2, overlap_s / 2)
+    cut = next((i for i, seg in enumerate(segments) if seg['end'] > next_start), len(segments))
+    return segments[:cut], segments[cut:]
+
+
+def _trim(segments, keep_from, keep_to=None):
+    """
+    Segments of an overlap zone restricted to its words [keep_from, keep_to)
+    Segments keep their own edges; one cut in the middle keeps its share of
+    the words and a proportional share of its time span
+    """
+    trimmed = []
+    pos = 0
+    for seg in segments:
+        words = seg['text'].split()
+        lo = max(keep_from - pos, 0)
+        hi = len(words) if keep_to is None else min(keep_to - pos, len(words))
+        pos += len(words)
+        if lo >= hi:
+            continue
+        if lo == 0 and hi == len(words):
+            trimmed.append(dict(seg))
+            continue
+        span = seg['end'] - seg['start']
+        trimmed.append({
+            'start': seg['start'] + span * lo / len(words),
+            'end': seg['start'] + span * hi / len(words),
+            'text': ' '.join(words[lo:hi])
+        })
+    return trimmed
+
+
+def init_worker(config, threads, worker_init=None):
+    """Pool initializer: one engine per worker process, cores split between workers"""
+    import torch
+
+    from stt_engine import SpeechToTextEngine
+
+    if worker_init is not None:
+        worker_init()
+    torch.set_num_threads(threads)
+    _worker['engine'] = SpeechToTextEngine(**config)
+
+
+def transcribe_shard(audio, start_s, end_s, window_s):
+    """
+    Transcribe [start_s, end_s) of a recording (runs in a worker)
+    Returns:
+        dict: segments (recording time), chunks, speech_seconds, asr_seconds
+    """
+    engine = _worker['engine']
+    overlap_s = min(engine.window_overlap_s, window_s / 2)
+    segments = []
+    held = []
+    chunks = 0
+    speech = 0.0
+    asr_time = 0.0
+    for start, samples in iter_audio_windows(audio, window_s, TARGET_SR, start_s=start_s, decoder=engine.decoder,
+                                             overlap_s=overlap_s):
+        if start >= end_s:
+            break
+        samples = samples[:int(math.ceil((end_s - start) * TARGET_SR))]
+        t0 = time.perf_counter()
+        window_segments, window_chunks, window_speech = engine._transcribe_window(start, samples)
+        asr_time += time.perf_counter() - t0
+        ready, held = merge_window(held, start, window_segments, start + window_s, overlap_s)
+        segments += ready
+        chunks += window_chunks
+        speech += window_speech
+    segments += held
+    return {'segments': segments, 'chunks': chunks, 'speech_seconds': speech, 'asr_seconds': asr_time}
+
+
+def default_shards():
+    """One shard per available core"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
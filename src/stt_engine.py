@@ -1,53 +1,425 @@
 # Speech-to-Text Engine
 # Using Hugging Face Whisper model
 
-import librosa
-import torch
-from transformers import pipeline
+import math
+import os
+import time
+
+from audio_stream import TARGET_SR, as_audio_path, audio_duration, iter_audio_windows
+from disk_cache import hash_source, make_key, open_cache
+from inference_backends import check_backend, default_backend
+from instrumentation import NULL_PROFILER, make_profiler
+from model_registry import get_registry
+from sharding import (
+    DEFAULT_OVERLAP_S, default_shards, init_worker, merge_window, plan_shards, stitch_segments, transcribe_shard
+)
+from vad import compact_speech, detect_speech
+
+# Start method for shard workers; fork is unsafe once torch has started its threads
+SHARD_MP_CONTEXT = "spawn"
+
+# Audio each streaming window shares with the next, so a word cut by one
+# window's edge is heard whole by the other
+WINDOW_OVERLAP_S = 4.0
+
+# Rough working-set size of one 30s whisper chunk during batched inference
+CHUNK_MEMORY_MB = 150
+MAX_AUTO_BATCH_SIZE = 16
+
+
+def _available_memory_bytes():
+    """Free physical memory, or None where the OS doesn't expose it"""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def auto_batch_size(device="cpu"):
+    """
+    Pick a chunk batch size from core count and free memory
+    On CPU one chunk per core keeps every core busy; memory caps it either way
+    """
+    if device == "cpu":
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cores = os.cpu_count() or 1
+        batch_size = cores
+    else:
+        batch_size = MAX_AUTO_BATCH_SIZE
+    
+    available = _available_memory_bytes()
+    if available is not None:
+        # Leave half of free memory for decoding and the rest of the app
+        by_memory = int(available * 0.5 // (CHUNK_MEMORY_MB * 1024 * 1024))
+        batch_size = min(batch_size, by_memory)
+    
+    return max(1, min(batch_size, MAX_AUTO_BATCH_SIZE))
+
+
+def _cuda_available():
+    """GPU check; torch is imported here, when an engine is built, not at module import"""
+    import torch
+    return torch.cuda.is_available()
+
+
+def default_transcript_cache():
+    """Shared on-disk transcript cache (size from LECTURE_AI_TRANSCRIPT_CACHE_MB)"""
+    return open_cache("transcripts", float(os.environ.get("LECTURE_AI_TRANSCRIPT_CACHE_MB", 1024)))
+
 
 class SpeechToTextEngine:
-    def __init__(self, model_name="openai/whisper-tiny"):
+    def __init__(self, model_name="openai/whisper-tiny", batch_size=None, vad=False, cache=None,
+                 profile=None, backend=None, checkpoints=None, decoder=None):
         """
         Initialize STT engine with Whisper model
         model_name options: whisper-tiny (fastest), whisper-base, whisper-small
-        Using whisper-tiny for 5-30min optimal speed on CPU
-        """
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.pipe = pipeline(
-            "automatic-speech-recognition",
-            model=model_name,
-            device=0 if self.device == "cuda" else -1,
-            chunk_length_s=30  # Process in 30-second chunks
+        Using whisper-tiny for optimal speed on CPU
+        batch_size: 30s chunks run through the model together (None = auto)
+        vad: Skip silence with a voice-activity pre-pass before whisper
+        cache: DiskCache for finished transcripts (None disables caching)
+        profile: Record per-stage timings in results (None = LECTURE_AI_PROFILE)
+        backend: 'fp32', 'int8' (quantized linear layers) or 'onnx' (ONNX Runtime);
+            the optimized backends run on CPU (None = LECTURE_AI_BACKEND)
+        checkpoints: CheckpointStore persisting each finished window, so an
+            interrupted run of the same audio resumes (None disables)
+        decoder: Audio decoder tried first: 'soundfile', 'ffmpeg' or 'audioread'
+            (None picks the fastest for the format, or LECTURE_AI_DECODER)
+        """
+        self.model_name = model_name
+        self.backend = check_backend(backend or default_backend())
+        self.device = "cuda" if self.backend == "fp32" and _cuda_available() else "cpu"
+        self.chunk_length_s = 30  # Process in 30-second chunks
+        self.batch_size = batch_size or auto_batch_size(self.device)
+        self.vad = vad
+        self.cache = cache
+        self.checkpoints = checkpoints
+        self.profile = profile
+        self.decoder = decoder
+        self.window_overlap_s = WINDOW_OVERLAP_S
+        self._shard_pool = None
+        self._shard_pool_config = None
+        
+        # Warm the shared registry so the first transcription doesn't pay the load
+        self.pipe
+    
+    @property
+    def pipe(self):
+        """Whisper pipeline from the process-wide model registry"""
+        return get_registry().get_pipeline(
+            "automatic-speech-recognition", self.model_name, self.device, self.backend
         )
     
-    def transcribe(self, audio_path):
+    def count_chunks(self, num_samples):
+        """Number of chunks the pipeline cuts a window into (default 1/6 stride)"""
+        chunk_len = int(self.chunk_length_s * TARGET_SR)
+        stride = int(self.chunk_length_s / 6 * TARGET_SR)
+        step = chunk_len - 2 * stride
+        if num_samples <= chunk_len:
+            return 1
+        return math.ceil((num_samples - chunk_len) / step) + 1
+    
+    def _transcribe_window(self, start, audio, profiler=NULL_PROFILER):
         """
-        Transcribe audio file to text (optimized for 5-30 min)
+        Run one window through whisper
+        Returns:
+            (segments, chunks, speech_seconds) with segment times in
+            seconds from the start of the recording
+        """
+        window_end = start + len(audio) / TARGET_SR
+        time_map = None
+        
+        if self.vad:
+            with profiler.stage('vad'):
+                regions = detect_speech(audio, TARGET_SR)
+                audio, time_map = compact_speech(audio, regions, TARGET_SR)
+            if len(audio) == 0:
+                return [], 0, 0.0
+        
+        with profiler.stage('asr'):
+            result = self.pipe(
+                audio,
+                chunk_length_s=self.chunk_length_s,
+                batch_size=self.batch_size,
+                return_timestamps=True
+            )
+        
+        def to_original(t, default):
+            if t is None:
+                return default
+            if time_map is not None:
+                t = time_map.to_original(t)
+            return min(start + t, window_end)
+        
+        segments = []
+        for chunk in result.get('chunks', []):
+            text = chunk['text'].strip()
+            if not text:
+                continue
+            seg_start, seg_end = chunk['timestamp']
+            seg_start = to_original(seg_start, start)
+            segments.append({
+                'start': seg_start,
+                'end': to_original(seg_end, window_end),
+                'text': text
+            })
+        
+        # Pipelines without timestamp support still return the window text
+        if not segments and result['text'].strip():
+            segments.append({'start': start, 'end': window_end, 'text': result['text'].strip()})
+        
+        return segments, self.count_chunks(len(audio)), len(audio) / TARGET_SR
+    
+    def cache_key(self, audio_hash, window_s):
+        """Cache key: audio content plus everything that changes the decoded text"""
+        return make_key('transcript', audio_hash, self.model_name, {
+            'chunk_length_s': self.chunk_length_s,
+            'window_s': window_s,
+            'window_overlap_s': self.window_overlap_s,
+            'vad': self.vad,
+            'backend': self.backend
+        })
+    
+    def transcribe_stream(self, audio, window_s=60, result=None):
+        """
+        Transcribe audio, yielding timestamped segments as each window finishes
+        Time to first text is one window of audio, not the whole lecture.
+        Consecutive windows overlap by window_overlap_s and are stitched on
+        the words both heard; segments reaching into the next window are
+        yielded once it has been stitched.
         Args:
-            audio_path: Path to audio file (.mp3, .wav, etc.)
+            audio: Path to audio file (.mp3, .wav, etc.), bytes, or a binary
+                file-like object such as an upload buffer (decoded in memory)
+            window_s: Seconds of audio per model call (smaller = earlier first text)
+            result: Optional dict filled with the same fields transcribe() returns
+                once the stream is exhausted
+        Yields:
+            dict: {'start', 'end', 'text'} with times in seconds
+        """
+        if result is None:
+            result = {}
+        profiler = make_profiler('stt', self.profile)
+        
+        key = None
+        checkpoints = self.checkpoints if window_s is not None else None
+        if self.cache is not None or checkpoints is not None:
+            with profiler.stage('cache_lookup'):
+                key = self.cache_key(hash_source(audio), window_s)
+                cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                yield from cached['segments']
+                result.update(cached, cached=True, profile=profiler.report())
+                return
+        
+        segments = []
+        held = []
+        duration = 0.0
+        speech_duration = 0.0
+        chunks = 0
+        new_chunks = 0
+        asr_time = 0.0
+        overlap_s = min(self.window_overlap_s, window_s / 2) if window_s is not None else 0.0
+        
+        # Replay windows an interrupted run already finished, then pick up after them
+        done = checkpoints.load(key) if checkpoints is not None else []
+        for idx, window in enumerate(done):
+            chunks += window['chunks']
+            speech_duration += window['speech']
+            duration = window['end']
+            ready, held = merge_window(held, idx * window_s, window['segments'], (idx + 1) * window_s, overlap_s)
+            for segment in ready:
+                segments.append(segment)
+                yield segment
+        resume_s = len(done) * window_s if done else 0.0
+        
+        # Each 16kHz window goes to the model as soon as it is read
+        for idx, (start, samples) in enumerate(
+            iter_audio_windows(audio, window_s, TARGET_SR, profiler, start_s=resume_s, decoder=self.decoder,
+                               overlap_s=overlap_s),
+            len(done)
+        ):
+            t0 = time.perf_counter()
+            window_segments, window_chunks, speech = self._transcribe_window(start, samples, profiler)
+            asr_time += time.perf_counter() - t0
+            
+            chunks += window_chunks
+            new_chunks += window_chunks
+            speech_duration += speech
+            duration = start + len(samples) / TARGET_SR
+            if checkpoints is not None:
+                with profiler.stage('checkpoint'):
+                    checkpoints.save(key, idx, {
+                        'segments': window_segments,
+                        'chunks': window_chunks,
+                        'speech': speech,
+                        'end': duration
+                    })
+            next_start = start + window_s if window_s is not None else duration
+            ready, held = merge_window(held, start, window_segments, next_start, overlap_s)
+            for segment in ready:
+                segments.append(segment)
+                yield segment
+        for segment in held:
+            segments.append(segment)
+            yield segment
+        
+        result.update({
+            'text': ' '.join(seg['text'] for seg in segments),
+            'segments': segments,
+            'status': 'success',
+            'duration': duration,
+            'speech_duration': speech_duration,
+            'batch_size': self.batch_size,
+            'chunks': chunks,
+            'chunks_per_second': new_chunks / asr_time if asr_time > 0 else 0.0
+        })
+        if self.cache is not None:
+            with profiler.stage('cache_store'):
+                self.cache.set(key, result)
+        if checkpoints is not None:
+            checkpoints.clear(key)
+        result['cached'] = False
+        result['resumed_windows'] = len(done)
+        result['profile'] = profiler.report()
+    
+    def transcribe(self, audio, window_s=300):
+        """
+        Transcribe audio to text, streaming it window by window
+        Args:
+            audio: Path to audio file (.mp3, .wav, etc.), bytes, or a binary
+                file-like object such as an upload buffer (decoded in memory)
+            window_s: Seconds of audio decoded and sent to the model at a time;
+                peak memory is bounded by this, not by lecture length.
+                None loads the whole file in one window.
         Returns:
             dict: {
                 'text': full transcript,
-                'duration': audio duration in seconds
+                'segments': [{'start', 'end', 'text'}] timed against the recording,
+                'duration': audio duration in seconds,
+                'speech_duration': seconds actually sent to whisper,
+                'chunks_per_second': ASR throughput for batch size tuning
+            }
+        """
+        try:
+            result = {}
+            for _ in self.transcribe_stream(audio, window_s, result):
+                pass
+            return result
+        except Exception as e:
+            return {
+                'text': None,
+                'error': str(e),
+                'status': 'failed'
             }
+    
+    def _get_shard_pool(self, workers, threads, worker_init):
+        """
+        Worker processes for transcribe_sharded, started on first use and kept
+        so each worker loads whisper once, not once per lecture
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        
+        config = (workers, threads, worker_init)
+        if self._shard_pool is not None and self._shard_pool_config != config:
+            self.close()
+        if self._shard_pool is None:
+            engine_config = {
+                'model_name': self.model_name,
+                'batch_size': self.batch_size,
+                'vad': self.vad,
+                'backend': self.backend,
+                'decoder': self.decoder
+            }
+            self._shard_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(SHARD_MP_CONTEXT),
+                initializer=init_worker,
+                initargs=(engine_config, threads, worker_init)
+            )
+            self._shard_pool_config = config
+        return self._shard_pool
+    
+    def close(self):
+        """Stop the shard worker processes, if any were started"""
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown()
+            self._shard_pool = None
+            self._shard_pool_config = None
+    
+    def transcribe_sharded(self, audio, shards=None, window_s=60, overlap_s=DEFAULT_OVERLAP_S, worker_init=None,
+                           threads=None):
+        """
+        Transcribe one recording in parallel shards across worker processes
+        The recording is cut into contiguous time shards that overlap their
+        neighbours by overlap_s; every worker loads its own model and the
+        shard transcripts are stitched where the overlapping words line up,
+        so boundary words are neither repeated nor dropped.
+        Args:
+            audio: Path, bytes, or binary file-like object (spooled to one temp file the workers read)
+            shards: Number of shards and worker processes (None = one per core);
+                shards shorter than a minute are merged
+            window_s: Seconds of audio per model call inside each shard
+            overlap_s: Seconds both neighbours transcribe around each boundary
+            worker_init: Optional picklable callable run first in each worker
+            threads: Torch threads per shard worker (None = this process's
+                cores split between the shards); callers that run several
+                sharded transcriptions at once pass their share
+        Returns:
+            dict: same fields as transcribe(), plus 'shards'
         """
         try:
-            # Load audio (16kHz sample rate)
-            audio, sr = librosa.load(audio_path, sr=16000)
+            profiler = make_profiler('stt', self.profile)
+            # Shard tasks are pickled, so workers get a path rather than the recording itself
+            with as_audio_path(audio) as audio:
+                shards = shards or default_shards()
+                with profiler.stage('plan'):
+                    duration = audio_duration(audio)
+                    plan = plan_shards(duration or 0.0, shards, overlap_s)
+                # Unknown length or too short to split: not worth starting workers
+                if duration is None or len(plan) == 1:
+                    return dict(self.transcribe(audio, window_s), shards=1)
             
-            # Limit to 30 minutes for optimal processing
-            max_duration = 1800  # 30 minutes
-            if len(audio) / sr > max_duration:
-                audio = audio[:max_duration * sr]
+                key = None
+                if self.cache is not None:
+                    with profiler.stage('cache_lookup'):
+                        key = make_key('sharded', self.cache_key(hash_source(audio), window_s), len(plan), overlap_s)
+                        cached = self.cache.get(key)
+                    if cached is not None:
+                        cached.update(cached=True, profile=profiler.report())
+                        return cached
             
-            # Transcribe with chunking for speed
-            result = self.pipe(audio)
+                threads = threads or max(1, default_shards() // shards)
+                with profiler.stage('shards'):
+                    pool = self._get_shard_pool(shards, threads, worker_init)
+                    futures = [pool.submit(transcribe_shard, audio, start, end, window_s) for start, end, _ in plan]
+                    parts = [future.result() for future in futures]
             
-            return {
-                'text': result['text'],
-                'status': 'success',
-                'duration': len(audio) / sr
-            }
+                with profiler.stage('stitch'):
+                    segments = parts[0]['segments']
+                    for (_, _, boundary), part in zip(plan[1:], parts[1:]):
+                        segments = stitch_segments(segments, part['segments'], boundary, overlap_s)
+            
+                chunks = sum(part['chunks'] for part in parts)
+                asr_time = sum(part['asr_seconds'] for part in parts)
+                result = {
+                    'text': ' '.join(seg['text'] for seg in segments),
+                    'segments': segments,
+                    'status': 'success',
+                    'duration': duration,
+                    'speech_duration': sum(part['speech_seconds'] for part in parts),
+                    'batch_size': self.batch_size,
+                    'chunks': chunks,
+                    'chunks_per_second': chunks / asr_time if asr_time > 0 else 0.0,
+                    'shards': len(plan)
+                }
+                if self.cache is not None:
+                    with profiler.stage('cache_store'):
+                        self.cache.set(key, result)
+                result['cached'] = False
+                result['profile'] = profiler.report()
+                return result
         except Exception as e:
             return {
                 'text': None,
@@ -1,20 +1,174 @@
 # Text Processing and Structuring
 # Cleaning, segmentation, and structure extraction
 
+import functools
 import re
-from nltk.tokenize import sent_tokenize
-import nltk
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from instrumentation import make_profiler
+from key_terms import default_key_term_index
+
+# Compiled once, reused for every transcript
+WHITESPACE = re.compile(r'\s+')
+URL = re.compile(r'http\S+|www.\S+')
+EMAIL = re.compile(r'\S+@\S+')
+
+
+def _common_prefix_len(a, b):
+    """Length of the longest common prefix (binary search over C-level slice compares)"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_len(a, b, limit):
+    """Length of the longest common suffix, at most `limit`"""
+    lo, hi = 0, min(len(a), len(b), limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+@functools.lru_cache(maxsize=None)
+def ensure_punkt():
+    """Check for (or download) the NLTK punkt_tab data once per process"""
+    import nltk
+
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        nltk.download('punkt_tab')
+
+
+@functools.lru_cache(maxsize=None)
+def _sentence_tokenizer(language="english"):
+    """Punkt model shared by all processors (loading it is not free)"""
+    from nltk.tokenize import PunktTokenizer
+
+    ensure_punkt()
+    return PunktTokenizer(language)
+
+
+class SpanList(Sequence):
+    def __init__(self, text, starts, ends):
+        """
+        Read-only list of substrings of `text`, stored as [start, end) offsets
+        Strings are only built when an item is read
+        """
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.text[s:e] for s, e in zip(self.starts[index].tolist(), self.ends[index].tolist())]
+        return self.text[int(self.starts[index]):int(self.ends[index])]
+
+    def __iter__(self):
+        text = self.text
+        for s, e in zip(self.starts.tolist(), self.ends.tolist()):
+            yield text[s:e]
+
+    def __repr__(self):
+        return f"SpanList({len(self)} spans)"
+
+
+class StructuredContent(Mapping):
+    _KEYS = ('original', 'cleaned', 'sentences', 'paragraphs', 'entities', 'profile')
+
+    def __init__(self, original, cleaned, sentence_spans, sentences_per_para, entities, profile=None):
+        """
+        Offset-based document model returned by structure_content
+        Sentences and paragraphs are int32 span arrays into the cleaned text,
+        exposed through the same dict keys the formatter and app always used
+        Args:
+            original: Raw transcript (kept by reference, not copied)
+            cleaned: Cleaned transcript all spans point into
+            sentence_spans: int array of shape (n, 2)
+            sentences_per_para: Sentences grouped into each paragraph
+            entities: Key terms as (term, label) tuples
+            profile: Stage timings of the structuring run
+        """
+        self.original = original
+        self.cleaned = cleaned
+        self.sentence_spans = sentence_spans
+        self.sentences_per_para = sentences_per_para
+        self.entities = entities
+        self.profile = profile or []
+
+    @property
+    def paragraph_spans(self):
+        """Paragraph i runs from its first sentence's start to its last sentence's end"""
+        spans = self.sentence_spans
+        if len(spans) == 0:
+            return spans
+        step = self.sentences_per_para
+        starts = spans[::step, 0]
+        ends = spans[np.minimum(np.arange(len(starts)) * step + step - 1, len(spans) - 1), 1]
+        return np.stack([starts, ends], axis=1)
+
+    @property
+    def sentences(self):
+        return SpanList(self.cleaned, self.sentence_spans[:, 0], self.sentence_spans[:, 1])
+
+    @property
+    def paragraphs(self):
+        spans = self.paragraph_spans
+        return SpanList(self.cleaned, spans[:, 0], spans[:, 1])
+
+    def __getitem__(self, key):
+        if key == 'num_sentences':
+            return len(self.sentence_spans)
+        if key == 'num_paragraphs':
+            return -(-len(self.sentence_spans) // self.sentences_per_para)
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS + ('num_sentences', 'num_paragraphs'))
+
+    def __len__(self):
+        return len(self._KEYS) + 2
+
+    def as_dict(self):
+        """Plain dict with materialized string lists (e.g. for JSON export)"""
+        return {
+            'original': self.original,
+            'cleaned': self.cleaned,
+            'sentences': list(self.sentences),
+            'paragraphs': list(self.paragraphs),
+            'entities': list(self.entities),
+            'profile': self.profile,
+            'num_sentences': self['num_sentences'],
+            'num_paragraphs': self['num_paragraphs']
+        }
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab')
 
 class TextProcessor:
-    def __init__(self):
-        """Initialize text processor"""
-        pass
+    def __init__(self, sentences_per_para=3, key_terms=None, profile=None):
+        """
+        Initialize text processor
+        key_terms: KeyTermIndex holding IDF statistics (default: shared, persisted)
+        profile: Record per-stage timings in results (None = LECTURE_AI_PROFILE)
+        """
+        self.sentences_per_para = sentences_per_para
+        self.key_terms = key_terms or default_key_term_index()
+        self.profile = profile
     
     def clean_text(self, text):
         """
@@ -24,65 +178,120 @@ class TextProcessor:
         - Fix common STT errors
         """
         # Remove extra spaces
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE.sub(' ', text)
         
         # Remove URLs
-        text = re.sub(r'http\S+|www.\S+', '', text)
+        text = URL.sub('', text)
         
         # Remove email addresses
-        text = re.sub(r'\S+@\S+', '', text)
+        text = EMAIL.sub('', text)
         
         return text.strip()
     
+    def sentence_spans(self, text):
+        """Tokenize once into an (n, 2) int32 array of sentence offsets"""
+        spans = np.fromiter(
+            (offset for span in _sentence_tokenizer().span_tokenize(text) for offset in span),
+            dtype=np.int32
+        )
+        return spans.reshape(-1, 2)
+    
     def segment_sentences(self, text):
         """Segment text into sentences"""
-        sentences = sent_tokenize(text)
-        return sentences
+        spans = self.sentence_spans(text)
+        return list(SpanList(text, spans[:, 0], spans[:, 1]))
     
     def segment_paragraphs(self, text, sentences_per_para=3):
         """Group sentences into paragraphs (optimized for speed)"""
-        sentences = self.segment_sentences(text)
-        paragraphs = []
-        
-        for i in range(0, len(sentences), sentences_per_para):
-            para = ' '.join(sentences[i:i + sentences_per_para])
-            paragraphs.append(para)
-        
-        return paragraphs
+        content = StructuredContent(text, text, self.sentence_spans(text), sentences_per_para, [])
+        return list(content.paragraphs)
     
-    def extract_key_entities(self, text):
-        """Extract important phrases (simple method)"""
-        # Simple entity extraction - extract all-caps words and proper nouns
-        words = text.split()
-        entities = []
-        
-        for i, word in enumerate(words):
-            # Check for all-caps words
-            if word.isupper() and len(word) > 2:
-                entities.append((word, "TERM"))
-            # Check for capitalized words (potential proper nouns)
-            elif word[0].isupper() and i > 0 and not word[0].isupper() == words[i-1][-1] == '.':
-                if len(word) > 3:
-                    entities.append((word, "PERSON/ORG"))
-        
-        return entities[:20]  # Limit to top 20
+    def extract_key_entities(self, text, sentences=None, top_k=20, update=True):
+        """
+        Extract key terms ranked by frequency x cross-lecture IDF
+        Args:
+            text: Cleaned transcript
+            sentences: Its sentences, if already segmented
+            top_k: Number of terms kept
+            update: Count the text as a new lecture in the IDF statistics
+        Returns:
+            list: [(term, "TERM")] most important first
+        """
+        if sentences is None:
+            sentences = self.segment_sentences(text)
+        ranked = self.key_terms.extract(sentences, top_k=top_k, update=update)
+        return [(term, "TERM") for term, _ in ranked]
     
     def structure_content(self, text):
         """
-        Main structuring pipeline
-        Returns structured representation
+        Main structuring pipeline (single pass)
+        The cleaned text is tokenized once; sentences and paragraphs are kept
+        as offsets into it and only turned into strings when read
+        Returns structured representation (dict-like StructuredContent)
         """
-        cleaned = self.clean_text(text)
-        sentences = self.segment_sentences(cleaned)
-        paragraphs = self.segment_paragraphs(cleaned)
-        entities = self.extract_key_entities(cleaned)
+        profiler = make_profiler('text', self.profile)
+        with profiler.stage('clean'):
+            cleaned = self.clean_text(text)
+        with profiler.stage('sentence_tokenize'):
+            spans = self.sentence_spans(cleaned)
+        with profiler.stage('key_terms'):
+            entities = self.extract_key_entities(cleaned, SpanList(cleaned, spans[:, 0], spans[:, 1]))
         
-        return {
-            'original': text,
-            'cleaned': cleaned,
-            'sentences': sentences,
-            'paragraphs': paragraphs,
-            'entities': entities,
-            'num_sentences': len(sentences),
-            'num_paragraphs': len(paragraphs)
-        }
+        return StructuredContent(
+            text, cleaned, spans, self.sentences_per_para, entities, profiler.report()
+        )
+    
+    def update_structure(self, previous, text):
+        """
+        Re-structure an edited transcript, reusing an earlier result
+        The cleaned texts are diffed and only the sentences touching the
+        changed characters (plus one on each side, since an edit can move a
+        boundary) are re-tokenized; spans after the edit are shifted. Key
+        terms are re-ranked without counting the edit as another lecture.
+        Args:
+            previous: structure_content() result for the transcript before the
+                edit (a plain as_dict() copy has no spans: it is redone in full)
+            text: Edited transcript
+        Returns:
+            StructuredContent, as structure_content(text) would build it
+        """
+        if not isinstance(previous, StructuredContent):
+            return self.structure_content(text)
+        
+        profiler = make_profiler('text', self.profile)
+        with profiler.stage('clean'):
+            cleaned = self.clean_text(text)
+        old = previous.cleaned
+        old_spans = previous.sentence_spans
+        if cleaned == old:
+            return StructuredContent(
+                text, cleaned, old_spans, self.sentences_per_para, previous.entities, profiler.report()
+            )
+        if len(old_spans) == 0:
+            return self.structure_content(text)
+        
+        with profiler.stage('diff'):
+            start = _common_prefix_len(old, cleaned)
+            suffix = _common_suffix_len(old, cleaned, min(len(old), len(cleaned)) - start)
+            old_end = len(old) - suffix
+            shift = len(cleaned) - len(old)
+        
+        with profiler.stage('sentence_tokenize'):
+            n = len(old_spans)
+            first = int(np.searchsorted(old_spans[:, 1], start, side='left')) - 1
+            last = int(np.searchsorted(old_spans[:, 0], old_end, side='right'))
+            first = min(max(first, 0), n - 1)
+            last = min(max(last, 0), n - 1)
+            region_start = min(int(old_spans[first, 0]), start)
+            region_end = max(int(old_spans[last, 1]), old_end) + shift
+            middle = self.sentence_spans(cleaned[region_start:region_end]) + region_start
+            spans = np.concatenate([old_spans[:first], middle, old_spans[last + 1:] + shift]).astype(np.int32)
+        
+        with profiler.stage('key_terms'):
+            entities = self.extract_key_entities(
+                cleaned, SpanList(cleaned, spans[:, 0], spans[:, 1]), update=False
+            )
+        
+        return StructuredContent(
+            text, cleaned, spans, self.sentences_per_para, entities, profiler.report()
+        )